@@ -0,0 +1,207 @@
+#__ LGPL 3.0, 2026 Alexander Soloviev (no.friday@yandex.ru)
+
+from mmap   import mmap, ACCESS_READ
+from struct import Struct
+from bisect import bisect_right
+from os     import lseek
+from errno  import ENXIO
+
+from comine.core.logger import log
+
+
+class ElfError(Exception):
+    pass
+
+
+class Image(object):
+    '''
+        Direct reader of ELF core image. Parses PT_LOAD program headers
+        of core file and serves reads of file backed parts of segments
+        from mmap() of the whole core file, no gdb calls involved.
+    '''
+
+    ET_CORE     = 4;    PT_LOAD     = 1;    PN_XNUM     = 0xffff
+
+    SEEK_DATA   = 3;    SEEK_HOLE   = 4     # linux lseek() whence values
+
+    __IDENT = Struct('4sBBB')
+
+    __CLASS = {
+        1 : (Struct('HHIIIIIHHHHHH'), Struct('IIIIIIII'), 28,
+                lambda x: (x[0], x[1], x[2], x[4], x[5])),
+        2 : (Struct('HHIQQQIHHHHHH'), Struct('IIQQQQQQ'), 44,
+                lambda x: (x[0], x[2], x[3], x[5], x[6])),
+    }
+
+    def __init__(s, path):
+        s.__path    = path
+        s.__file    = open(path, 'rb')
+        s.__map     = mmap(s.__file.fileno(), 0, access = ACCESS_READ)
+        s.__loads   = []    # [ (vaddr, end, offset) ] of file parts
+        s.__order   = None  # struct byte order prefix of core data
+
+        s.__parse()
+
+        s.__starts  = map(lambda x: x[0], s.__loads)
+
+    def __path__(s):    return s.__path
+
+    def __len__(s):     return len(s.__loads)
+
+    def __fileno__(s):  return s.__file.fileno()
+
+    def __order__(s):   return s.__order
+
+    def __bytes__(s):
+        return sum(map(lambda x: x[1] - x[0], s.__loads))
+
+    def enum(s):    # -> (rg, offset)
+        for start, end, offset in s.__loads:
+            yield (start, end), offset
+
+    def locate(s, at, size):
+        '''
+            Returns core file offset for memory [at, at + size) or
+            None if region doesn't fit in a single file backed part
+            of some PT_LOAD segment.
+        '''
+
+        z = bisect_right(s.__starts, at) - 1
+
+        if z >= 0:
+            start, end, offset = s.__loads[z]
+
+            if at + size <= end:
+                return offset + (at - start)
+
+    def covers(s, rg):
+        return s.locate(rg[0], rg[1] - rg[0]) is not None
+
+    def read(s, at, size):
+        offset = s.locate(at, size)
+
+        if offset is not None:
+            return s.__map[offset:offset + size]
+
+    def view(s, at, size):
+        ''' Zero copy read only slice of image, py2 mmap lacks memoryview '''
+
+        offset = s.locate(at, size)
+
+        if offset is not None:
+            return buffer(s.__map, offset, size)
+
+    def extents(s, rg):     # -> (rg, data)
+        '''
+            Splits memory region covered by image to file data extents
+            and holes using lseek() SEEK_DATA and SEEK_HOLE, holes are
+            read as zeroes. Whole region is given as data if the file
+            system doesn't support sparse files seeks.
+        '''
+
+        offset = s.locate(rg[0], rg[1] - rg[0])
+
+        if offset is None:
+            raise ValueError('region is out of image')
+
+        _2mem = lambda x: rg[0] + (x - offset)
+
+        at, end = offset, offset + (rg[1] - rg[0])
+
+        while at < end:
+            try:
+                data = min(end, lseek(s.__fileno__(), at, Image.SEEK_DATA))
+
+            except OSError as E:
+                if E.errno != ENXIO:
+                    yield (_2mem(at), rg[1]), True; break
+
+                data = end
+
+            if data > at:
+                yield (_2mem(at), _2mem(data)), False
+
+            if data < end:
+                hole = min(end, lseek(s.__fileno__(), data, Image.SEEK_HOLE))
+
+                yield (_2mem(data), _2mem(hole)), True
+
+                at = hole
+
+            else:
+                break
+
+    def find(s, sub, rg):
+        offset = s.locate(rg[0], rg[1] - rg[0])
+
+        if offset is None:
+            raise ValueError('region is out of image')
+
+        at, end = offset, offset + (rg[1] - rg[0])
+
+        while True:
+            at = s.__map.find(sub, at, end)
+
+            if at < 0: break
+
+            yield rg[0] + (at - offset)
+
+            at += len(sub)
+
+    def __parse(s):
+        magic, klass, order, _ = Image.__IDENT.unpack_from(s.__map, 0)
+
+        if magic != '\x7fELF':
+            raise ElfError('not an ELF file %s' % s.__path)
+
+        if klass not in Image.__CLASS:
+            raise ElfError('unknown ELF class %u' % klass)
+
+        pref = s.__order = { 1 : '<', 2 : '>' }.get(order)
+
+        if pref is None:
+            raise ElfError('unknown ELF data encoding %u' % order)
+
+        ehdr, phdr, info, conv = Image.__CLASS[klass]
+
+        ehdr, phdr = Struct(pref + ehdr.format), Struct(pref + phdr.format)
+
+        head = ehdr.unpack_from(s.__map, 16)
+
+        kind, phoff, shoff, phsize, phnum = head[0], head[4], head[5], \
+                                                head[8], head[9]
+
+        if kind != Image.ET_CORE:
+            raise ElfError('ELF %s is not a core, type=%u' % (s.__path, kind))
+
+        if phnum == Image.PN_XNUM:
+            phnum = Struct(pref + 'I').unpack_from(s.__map, shoff + info)[0]
+
+        for z in xrange(phnum):
+            ptype, offset, vaddr, filesz, memsz \
+                    = conv(phdr.unpack_from(s.__map, phoff + z * phsize))
+
+            if ptype == Image.PT_LOAD and filesz > 0:
+                if offset + filesz > len(s.__map):
+                    filesz = max(0, len(s.__map) - offset)
+
+                    log(1, 'truncated core, segment at 0x%x %s' % (vaddr,
+                            'is dropped' if filesz < 1 else
+                            'clipped to 0x%x bytes' % filesz))
+
+                if filesz > 0:
+                    s.__loads.append((vaddr, vaddr + filesz, offset))
+
+        s.__loads.sort()
+
+
+class Reader(object):
+    ''' Infer like reader of core image for pool workers '''
+
+    def __init__(s, image):
+        s.__image   = image
+
+    def __order__(s):   return s.__image.__order__()
+
+    def readvar(s, at, size, gdbval = True):
+        return s.__image.view(at, size)
@@ -9,8 +9,11 @@ from comine.mine.revix  import Revix
 from comine.mine.zero   import Zeroes
 from comine.mine.index  import Index, Locate
 from comine.mine.trace  import Trace, Clect
-from comine.mine.lost   import Lost, Walk
+from comine.mine.lost   import Lost, Mark, Walk
+from comine.mine.graph  import Graph, Builder
+from comine.mine.retain import Retain
 from comine.misc.humans import Humans
+from comine.misc.vec    import numpy
 
 
 @CLines.register
@@ -19,13 +22,43 @@ class CMine(CLines):
         CLines.__init__(s, 'mine')
 
     def __sub_mine_revix(s, infer, argv):
+        qry = {
+                0: (-1, None),
+
+                1: (0, [
+                        ('vec', 1, ('vector', True)),
+                        ('pack', 1, ('packed', True)),
+                        ('jobs', 2, None),
+                        ('mem', 4, None) ]),
+                2: (3, [
+                        ('=', 3, None) ]),
+                3: (-1, (int, 1, ('jobs',)) ),
+                4: (5, [
+                        ('=', 5, None) ]),
+                5: (-1, (int, 1, ('mem',)) )
+        }
+
+        kw = Eval(qry)(argv)
+
+        if infer.__layout__() is None:
+            raise CFail('layout with core required')
+
+        if kw.get('vector') and numpy is None:
+            raise CFail('vectorized scan requires numpy')
+
+        Revix(infer, **kw).build()
+
+    def __sub_mine_graph(s, infer, argv):
         if argv.next() is not None:
             raise CFail('command does not accept args')
 
         if infer.__layout__() is None:
             raise CFail('layout with core required')
 
-        Revix(infer).build()
+        if numpy is None:
+            raise CFail('chunks graph requires numpy')
+
+        Builder(infer).build()
 
     def __sub_mine_zero(s, infer, argv):
         if argv.next() is not None:
@@ -74,6 +107,8 @@ class CMine(CLines):
                 print "  0x%x <- 0x%x" % (at, refer)
 
     def __sub_mine_lost(s, infer, argv):
+        Zeroes(infer).load(build = False)
+
         terms = Lost.terminals(infer.__world__())
 
         print('found %s terminals in %u regs'
@@ -81,10 +116,80 @@ class CMine(CLines):
 
         save = infer.__layout__().special('cache') + '/lost.chunks'
         heap = infer.__heman__().get()
-        lost = Lost(heap, Locate(infer), terms.make(), cache = 2**20)
+        graph = numpy and Graph.locate(infer)
+
+        if graph:
+            lost = Mark(graph, terms)
+
+            print('marked %u chunks of %u' % (len(graph) - len(lost),
+                                                len(graph)))
+
+        else:
+            lost = Lost(heap, Locate(infer), terms.make(), cache = 2**20)
 
         Walk(save)(lost, it = heap.enum())
 
+    def __sub_mine_retain(s, infer, argv):
+        qry = {
+                0: (-1, None),
+
+                1: (0, [
+                        ('mem', 3, None),
+                        ('time', 5, None),
+                        ('top', 2, None) ]),
+                2: (-1, (int, 1, ('top',)) ),
+                3: (4, [
+                        ('=', 4, None) ]),
+                4: (-1, (int, 1, ('mem',)) ),
+                5: (6, [
+                        ('=', 6, None) ]),
+                6: (-1, (int, 1, ('time',)) )
+        }
+
+        kw = Eval(qry)(argv)
+
+        graph = numpy and Graph.locate(infer)
+
+        if not graph:
+            raise CFail('chunks graph is not found, do mine graph')
+
+        budget, limit = kw.get('mem', 4096) << 20, kw.get('time', 60) * 60
+
+        cost, spent = Retain.cost(graph), Retain.estimate(graph)
+
+        line = 'graph of %u chunks needs %s and about %s' \
+                    % (len(graph), Humans.bytes(cost), Humans.delta(spent))
+
+        if cost > budget:
+            raise CFail('%s, over mem=%u MiB' % (line, budget >> 20))
+
+        elif spent > limit:
+            raise CFail('%s, over time=%u min' % (line, limit // 60))
+
+        print(line)
+
+        Zeroes(infer).load(build = False)
+
+        terms = Lost.terminals(infer.__world__())
+
+        ret = Retain(graph, terms, budget = budget)
+
+        print('dominated %u chunks of %u' % (len(ret), len(graph)))
+
+        for seq, z in enumerate(ret.top(kw.get('top', 16))):
+            (rel, at, size, gran), (bytes, count) \
+                    = graph.chunk(z), ret.retained(z)
+
+            rlit = IHeap.REL_NAMES.get(rel, '?%u' % rel)
+
+            print('  #%02u %6s 0x%012x %8ub retains %s in %u chunks'
+                    % (seq, rlit, at, size, Humans.bytes(bytes), count))
+
+            for size, count in sorted(ret.breakdown(z).items()):
+                bytes = Humans.bytes(size * count)
+
+                print '       %8ub %6u %8s' % (size, count, bytes)
+
     def __sub_mine_trace(s, infer, argv):
         at      = int(argv.next(), 0)
         offset  = int(argv.next())
@@ -114,9 +219,15 @@ class CMine(CLines):
                     % (seq, di, rlit, at, off, size, gran))
 
     def __show_occurance(s, world, index, rg):
+        _ref = lambda x: x[1]
+
         def _enum():
-            for at, ref in index.lookup(rg):
-                for offset, _, span in world.lookup(ref):
+            refs = list(index.lookup(rg))
+
+            spans = dict(world.lookup_many(sorted(set(map(_ref, refs)))))
+
+            for at, ref in refs:
+                for offset, _, span in spans[ref]:
                     yield (at, ref, offset, span)
 
         for seq, (at, ref, offset, span) in enumerate(_enum()):
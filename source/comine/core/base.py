@@ -9,6 +9,7 @@ from comine.maps.exten  import IExten
 from comine.maps.ring   import Ring, Span
 from comine.maps.tools  import Tools
 from comine.arch.proc   import Maps
+from comine.arch.elf    import Image, ElfError
 
 class Core(IOwner):
     "Core dump components discover"
@@ -16,6 +17,7 @@ class Core(IOwner):
     def __init__(s, infer):
         s.__infer   = infer
         s.__ring    = Ring()
+        s.__image   = s.__open_image(infer.__layout__())
 
         s.__read_maps_target()
 
@@ -27,10 +29,42 @@ class Core(IOwner):
 
     def __len__(s): return s.__ring.__len__()
 
+    def __image__(s):   return s.__image
+
+    def read(s, at, size):
+        ''' Read blob directly from core image, None if not covered '''
+
+        if s.__image is not None:
+            return s.__image.read(at, size)
+
+    def __open_image(s, layout):
+        path = layout and layout.__core__()
+
+        if path is not None:
+            try:
+                image = Image(path)
+
+            except (ElfError, IOError) as E:
+                log(1, 'cannot use core image directly, %s' % str(E))
+
+            else:
+                log(2, 'mapped %s in %u loads of core image'
+                        % (Humans.bytes(image.__bytes__()), len(image)))
+
+                return image
+
     def __read_maps_target(s):
         for back, rg, section, name in Targets.enum():
             if rg[0] < rg[1]:
-                if back == IMaps.BACK_CORE:
+                if back != IMaps.BACK_CORE:
+                    pass
+
+                elif s.__image and s.__image.covers(rg):
+                    exten = EImage(rg, s.__infer, s.__image)
+
+                    span = s.__ring.make(rg, exten = exten)
+
+                else:
                     exten = ECore(rg, infer = s.__infer)
 
                     span = s.__ring.make(rg, exten = exten)
@@ -117,11 +151,15 @@ class EInfer(EPhys):
 
     def __rg__(s):  return s.__rg
 
-    def search(s, sub):
-        at = s.__rg[0] or 0
+    def search(s, sub, rg = None):
+        rg = Tools.isect(s.__rg, rg or s.__rg)
 
-        while at is not None and at < s.__rg[1]:
-            at = s.__infer.search_memory(at, s.__rg[1] - at, sub)
+        if rg is None: return
+
+        at = rg[0] or 0
+
+        while at is not None and at < rg[1]:
+            at = s.__infer.search_memory(at, rg[1] - at, sub)
 
             if at:
                 yield at
@@ -155,6 +193,36 @@ class ECore(EInfer):
     def __desc__(s):    return 'Core'
 
 
+class EImage(ECore):
+    ''' Core memory served from mmap()'ed core image, bypassing gdb '''
+
+    __slots__ = ('_EImage__image', )
+
+    def __init__(s, rg, infer, image):
+        ECore.__init__(s, rg, infer)
+
+        s.__image   = image
+
+    def __desc__(s):    return 'Core(image)'
+
+    def __image__(s):   return s.__image
+
+    def search(s, sub, rg = None):
+        rg = Tools.isect(s.__rg__(), rg or s.__rg__())
+
+        return iter([]) if rg is None else s.__image.find(sub, rg)
+
+    def read(s, at, size):
+        blob = s.__image.read(at, size)
+
+        return ECore.read(s, at, size) if blob is None else blob
+
+    def view(s, at, size):
+        blob = s.__image.view(at, size)
+
+        return ECore.view(s, at, size) if blob is None else blob
+
+
 class EMem(EInfer):
     def __desc__(s):    return 'Mem'
 
@@ -9,7 +9,7 @@ class Freg(object):
     ''' Fast addr region lookup object '''
 
     def __init__(s, regs, model, gran = 0):
-        tag = Freq.__model_to_tag(model)
+        tag = Freg.__model_to_tag(model)
 
         regs = Freg.__glide(regs, gran)
 
@@ -57,6 +57,11 @@ class Freg(object):
 
     def __len__(s): return len(s.__start)
 
+    def bounds(s):
+        ''' Returns sorted (starts, ends) lists of glided regions '''
+
+        return s.__start, s.__end[1:]
+
     def bytes(s):
         return sum(gmap(lambda rg: rg[1] - rg[0], s.enum()))
 
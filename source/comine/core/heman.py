@@ -1,6 +1,9 @@
 #__ LGPL 3.0, 2014 Alexander Soloviev (no.friday@yandex.ru)
 
-from time   import time
+from time       import time
+from os         import rename, unlink
+from os.path    import isfile, exists
+from cPickle    import load, dump, HIGHEST_PROTOCOL
 
 from comine.iface.heap  import IHeap
 from comine.core.trace  import trace_write
@@ -171,7 +174,7 @@ class _Inst(object):
             s.__start   = int(time())
 
             try:
-                s.__impl = s.__meta(log = s.__pass, infer = s.__infer)
+                s.__impl = s.__make(force)
 
             except Exception as E:
                 tb, s.__impl = [], False
@@ -188,6 +191,26 @@ class _Inst(object):
 
             return s.__ready__()
 
+    def __make(s, force):
+        cache = _Cache(s.__infer, s.__meta.__who__())
+
+        state = None if force is True else cache.load()
+
+        if state is not None:
+            impl = s.__meta.__cls__().restore(s.__pass, s.__infer, state)
+
+            if impl is not None:
+                s.__log(1, 'heap %s restored from cache' % s.__who__())
+
+                return impl
+
+        impl = s.__meta(log = s.__pass, infer = s.__infer)
+
+        if impl.__ready__():
+            cache.save(impl.__state__())
+
+        return impl
+
     def __reset(s):
         s.__start   = None
         s.__end     = None
@@ -202,4 +225,44 @@ class _Inst(object):
         s.__log(lev, line)
 
 
+class _Cache(object):
+    ''' Discovered heap state saved in layout cache as heap.<who> '''
+
+    def __init__(s, infer, who):
+        layout = infer.__layout__()
+
+        s.__ident   = layout and layout.__ident__()
+        s.__path    = None
+
+        if s.__ident is not None:
+            s.__path = layout.special('cache') + '/heap.' + who
+
+    def load(s):
+        if s.__path is not None and isfile(s.__path):
+            try:
+                with open(s.__path, 'rb') as F:
+                    ident, state = load(F)
+
+            except Exception as E:
+                log(1, 'cannot load heap cache %s, %s' % (s.__path, E))
+
+            else:
+                if ident == s.__ident: return state
+
+    def save(s, state):
+        ''' Saves state, failure is logged and never breaks discovery '''
+
+        if s.__path is not None and state is not None:
+            try:
+                with open(s.__path + '~', 'wb') as F:
+                    dump((s.__ident, state), F, HIGHEST_PROTOCOL)
+
+                rename(s.__path + '~', s.__path)
+
+            except Exception as E:
+                log(1, 'cannot save heap cache %s, %s' % (s.__path, E))
+
+                if exists(s.__path + '~'): unlink(s.__path + '~')
+
+
 __init__ = (HeMan, IHeap)
@@ -62,8 +62,17 @@ class Infer(object):
 
     def __world__(s):   return s.__world
 
+    def __core__(s):    return s.__core
+
     def __libc__(s):    return s.__libc
 
+    def __order__(s):
+        ''' Byte order of target data as struct format prefix '''
+
+        image = s.__core.__image__()
+
+        return image.__order__() if image else s.__tools.endian()
+
     def __heman__(s):   return s.__heman
 
     def search_memory(s, *kl, **kw):
@@ -99,7 +108,10 @@ class Infer(object):
             if isinstance(var, gdb.Value):
                 var = int(var.cast(s.__addr_t))
 
-            blob = s.__gin.read_memory(var, size)
+            blob = s.__core.read(var, size)
+
+            if blob is None:
+                blob = s.__gin.read_memory(var, size)
 
             return (constructor or (lambda x: x))(blob)
 
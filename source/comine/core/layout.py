@@ -55,6 +55,12 @@ class Layout(ILayout):
 
     def __root__(s):    return s.__abs(s.__root)
 
+    def __ident__(s):
+        st = stat(s.__core__())
+
+        return '%x:%x:%x:%x' % (st.st_dev, st.st_ino, st.st_size,
+                                    int(st.st_mtime))
+
     def special(s, kind, make = True):
         if kind not in ('cache', 'temp'):
             raise ValueError('Unknown special sub %u' % kind)
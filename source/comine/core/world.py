@@ -9,7 +9,7 @@ from comine.misc.puts   import Puts
 from comine.misc.func   import gmap
 from comine.maps.span   import Span
 from comine.maps.ring   import Ring
-from comine.maps.walk   import Walk, Diff, Glide, Delay
+from comine.maps.walk   import Walk, Diff, Glide
 from comine.core.base   import EMaps, EMem, ECore, EPadd
 from comine.core.freg   import Freg
 
@@ -23,6 +23,7 @@ class World(object):
         s.__rings   = {}    # class -> [ Rec() ]
         s.__by_seq  = {}    # seq   -> Rec()
         s.__by_prov = {}
+        s.__order   = []    # [ Rec() ] ordered by seq
 
     def __iter__(s):
         for items in s.__rings.values():
@@ -31,24 +32,92 @@ class World(object):
     def __model__(s):   return s.__model
 
     def lookup(s, at, pred = None): # -> [ (offset, rec, span) ]
-        def _get(rec):
-            span = rec.__ring__().lookup(at)[1]
+        '''
+            Gives spans of all rings holding the address ordered by rec
+            seq. Bounds arrays of rings are bisected, Span() objects are
+            touched only for hits.
+        '''
+
+        return s.__result(at, map(lambda x: (x, x.__ring__().find(at)),
+                                    s.__recs()), pred)
+
+    def lookup_many(s, addrs, pred = None): # -> (at, [ (offset, rec, span) ])
+        '''
+            Batch lookup() for sorted stream of addresses, each ring is
+            bisected only forward from its position for previous address.
+        '''
+
+        last, cursor = None, map(lambda x: [ x, None, -1 ], s.__recs())
+
+        def _find(at, item):    # item := [ rec, scn, z ]
+            ring = item[0].__ring__()
+
+            if item[1] != ring.__scn__():   # ring was changed, restart
+                item[1:] = [ ring.__scn__(), -1 ]
+
+            item[2], hit = ring.find(at, max(item[2], 0))
+
+            return (item[0], (item[2], hit))
+
+        for at in addrs:
+            if last is not None and at < last:
+                raise ValueError('addrs are not sorted')
+
+            found = map(lambda x: _find(at, x), cursor)
+
+            yield at, s.__result(at, found, pred)
+
+            last = at
+
+    @classmethod
+    def __result(cls, at, found, pred):
+        def _get(rec, (z, hit)):
+            span = rec.__ring__().span(z) if hit else None
 
             if span is not None and (not pred or pred(span)):
-                offset = at - span.__rg__()[0]
+                return (at - span.__rg__()[0], rec, span)
 
-                return (offset, rec, span)
+        return filter(None, map(lambda x: _get(*x), found))
 
-        return filter(None, map(_get, s))
+    def __recs(s):  return s.__order
 
     def search(s, blob):    # -> [ (at, offset, span) ]
+        '''
+            Yields all occurrences of blob in physical spans. Known zero
+            ranges are skipped only for blobs having a non zero byte,
+            such blob cannot lie inside of zero range.
+        '''
+
         walk = Walk(map(lambda x: x.__ring__(), s))
 
+        zeroes, pad = not blob.strip('\0'), len(blob) - 1
+
         for span in walk.order(pred = Pred.phys):
-            for at in span.exten().search(blob):
-                offset = at - span.__rg__()[0]
+            rgs = [ span.__rg__() ]
+
+            for rg in (rgs if zeroes else s.nonzero(rgs, pad = pad)):
+                for at in span.exten().search(blob, rg = rg):
+                    offset = at - span.__rg__()[0]
 
-                yield (at, offset, span)
+                    yield (at, offset, span)
+
+    def nonzero(s, rgs, pad = 0):
+        '''
+            Yields parts of regions rgs excluding known zero ranges, if
+            zero map is loaded. Zero ranges are shrunk by pad bytes to
+            keep data crossing edges of zero ranges.
+        '''
+
+        recs = s.__by_prov.get('zero')
+
+        zmap = recs and recs[0].__owner__().__zmap__()
+
+        for rg in rgs:
+            if zmap is None:
+                yield rg
+
+            else:
+                for place in zmap.subtract(rg, pad): yield place
 
     def validate(s, at):    # -> (reliability, result)
         at = int(at)
@@ -182,7 +251,7 @@ class World(object):
             return [ entity.__rg__() ]
 
         elif isinstance(entity, Ring):
-            return entity.enum(conv = lambda x: x.__rg__())
+            return map(lambda x: x[1:], entity.bounds())
 
         elif isinstance(entity, tuple):
             return [ Tools.check(entity, extend = False) ]
@@ -217,6 +286,8 @@ class World(object):
 
         s.__by_seq[rec.__seq__()] = rec
 
+        s.__order.append(rec)   # seq grows, order is kept
+
         uprov = World.__is_uniq_prov(provide)
 
         World.__add(s.__by_prov, provide, rec, uniq = uprov)
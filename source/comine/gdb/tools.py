@@ -49,6 +49,11 @@ class Tools(object):
         if g is not None:
             return g.group(1)
 
+    def endian(s):
+        ''' Target byte order as struct format prefix '''
+
+        return '>' if 'big endian' in s.call('show endian') else '<'
+
     def version(s):
         for line in s.call('show version').split('\n'):
             m = match('GNU gdb \([^)]+\) (.+)', line)
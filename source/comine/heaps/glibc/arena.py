@@ -2,23 +2,28 @@
 
 import gdb
 
+from array              import array
+from bisect             import bisect_left
+
 from comine.iface.heap 	import IHeap
 from comine.maps.errors import MapOutOf
 from comine.maps.alias  import Alias
 from comine.maps.span   import Span
 from comine.misc.types  import Types
 from comine.misc.humans import Humans
+from comine.misc.vec    import U64
 from .errors			import ErrorDamaged, AnalysisError
 from .guess				import Guess
 from .chunk				import Chunk
 from .scale				import Scale
 from .exten             import EHeap
+from .walk              import Lists
 
 
 class Arena(object):
     FL_NON_CONTIGOUS    = 0x02
 
-    def __init__(s, sc, struct, seq, ring, log, infer):
+    def __init__(s, sc, struct, seq, ring, log, infer, defer = False):
         if struct.type.code != gdb.TYPE_CODE_PTR:
             raise TypeError('pointer to struct is needed')
 
@@ -31,9 +36,12 @@ class Arena(object):
         s.__libc        = infer.__libc__()
         s.__world       = infer.__world__()
         s.__fence       = []
+        s.__free        = []
         s.__ring        = ring
         s.__bound       = None
         s.__sc          = Types.ensure(sc, Scale)
+        s.__defer       = None
+        s.__lists       = Lists(s.__sc.__layout__(), infer, infer.__order__())
 
         s.__sysmem  = int(s.__arena['system_mem'])
         s.__bins = s.__arena['bins']
@@ -69,19 +77,45 @@ class Arena(object):
         s.__check_fasts()
         s.__check_bins()
 
+        s.__free.append(s.__top.__at__())
+
+        s.__free = array(U64, sorted(set(s.__free)))
+
         if s.__err_out_of > 0:
             s.__log(1, '%i aliases out of wild of arena #%i'
                         %(s.__err_out_of, s.__seq))
 
-        found = Guess(log, s.__world, ring).run('wild', s.__curb_the_wild)
+        if defer and not s.__wild.ami(Span.I_AM_A_WILD):
+            s.__defer = s.__catch_the_wild()
+
+        else:
+            found = Guess(log, s.__world, ring).run('wild', s.__curb_the_wild)
 
-        s.__log(1, 'arena #%i has at most of %s unresolved data'
-                % (s.__seq, Humans.bytes(s.__sysmem - found)))
+            s.__log(1, 'arena #%i has at most of %s unresolved data'
+                    % (s.__seq, Humans.bytes(s.__sysmem - found)))
 
     def __at__(s):  return s.__libc.addr(s.__arena)
 
     def __seq__(s): return s.__seq
 
+    def __sysmem__(s):  return s.__sysmem
+
+    def __free__(s):    return s.__free
+
+    def is_free(s, at):
+        ''' True if chunk at given addr is in bins, fastbins or top '''
+
+        return _is_free(s.__free, at)
+
+    def __wild__(s):    # -> (rg, fence, alias)
+        '''
+            Contigous wild of arena which curbing was deferred to caller,
+            None if the wild is already curbed into ring by arena itself.
+        '''
+
+        if s.__defer is not None:
+            return (s.__wild.__rg__(), list(s.__fence), list(s.__defer))
+
     def contigous(s):
         return not (s.__arena['flags'] & Arena.FL_NON_CONTIGOUS)
 
@@ -159,15 +193,17 @@ class Arena(object):
 
         chunks, _bytes = 0, 0
 
+        heads = s.__lists.heads(s.__libc.addr(s.__fasts.address), _rg[1] + 1)
+
         for x in xrange(*_rg):
-            if s.__fasts[x] == 0x0: continue
+            if heads[x] == 0x0: continue
 
-            first = Chunk(s.__sc, s.__fasts[x], Chunk.TYPE_FAST, _arena = s)
+            for at, size in s.__lists.fast(heads[x]):
+                s.__push_alias_to_wild(at)
 
-            for chunk in first:
-                s.__push_alias_to_wild(chunk.__at__())
+                s.__free.append(at)
 
-                chunks += 1; _bytes += len(chunk)
+                chunks += 1; _bytes += size
 
         s.__log(1, 'arena #%i has %i chunks and %ib in %i fastbins'
                     % (s.__seq, chunks, _bytes, _rg[1]))
@@ -175,10 +211,12 @@ class Arena(object):
     def __check_bins(s):
         chunks, _bytes = 0, 0
 
-        for chunk in s.__walk_bins(validate = True):
-            s.__push_alias_to_wild(chunk.__at__())
+        for at, size in s.__walk_bins(validate = True):
+            s.__push_alias_to_wild(at)
 
-            chunks += 1; _bytes += len(chunk)
+            s.__free.append(at)
+
+            chunks += 1; _bytes += size
 
         _rg = list(s.__bins.type.range()) + [2]
 
@@ -187,28 +225,25 @@ class Arena(object):
         s.__log(1, 'arena #%i has %i chunks and %s in %i bins'
                     % (s.__seq, chunks, _hu, _rg[1] >> 1))
 
-    def __walk_bins(s, validate = False):
-        addr_t  = s.__libc.std_type('addr_t')
-
+    def __walk_bins(s, validate = False):   # -> (at, size)
         _rg = list(s.__bins.type.range()) + [2]
 
         if not (_rg[1] & 0x01):
             raise Exception('Invalid bins array size')
 
+        heads = s.__lists.heads(s.__libc.addr(s.__bins.address), _rg[1] + 1)
+
         for x in xrange(*_rg):
-            if s.__bins[x] == s.__bins[x+1]: continue
+            if heads[x] == heads[x+1]: continue
 
             if validate is not False:
-                if not s.__infer.validate(s.__bins[x].cast(addr_t)):
-                    raise Exception('invalid bin list head')
+                for head in heads[x:x+2]:
+                    if s.__infer.readvar(head, 1, False) is None:
+                        raise Exception('invalid bin list head')
 
-                if not s.__infer.validate(s.__bins[x+1].cast(addr_t)):
-                    raise Exception('invalid bin list head')
+            it = s.__lists.bin(heads[x], heads[x+1], x >> 1, s.__fence)
 
-            first = Chunk(s.__sc, s.__bins[x], Chunk.TYPE_BIN, _arena = s,
-                            end = s.__bins[x+1], queue = x>>1)
-
-            for chunk in first: yield chunk
+            for at, size in it: yield (at, size)
 
     def __push_alias_to_wild(s, alias):
         try:
@@ -297,3 +332,28 @@ class Arena(object):
                     return (relation, offset, chunk)
         else:
             return (None, None, chunk)
+
+
+class Known(object):
+    ''' Arena known from previous discovery, restored from cache '''
+
+    __slots__ = ('_Known__seq', '_Known__at', '_Known__free')
+
+    def __init__(s, seq, at, free):
+        s.__seq     = seq
+        s.__at      = at
+        s.__free    = free
+
+    def __at__(s):  return s.__at
+
+    def __seq__(s): return s.__seq
+
+    def __free__(s):    return s.__free
+
+    def is_free(s, at): return _is_free(s.__free, at)
+
+
+def _is_free(free, at):
+    z = bisect_left(free, at)
+
+    return z < len(free) and free[z] == at
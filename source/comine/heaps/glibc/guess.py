@@ -1,9 +1,12 @@
 #__ LGPL 3.0, 2014 Alexander Soloviev (no.friday@yandex.ru)
 
+from array              import array
+
 from comine.maps.ring   import Ring
 from comine.maps.tools  import Tools
 from comine.misc.types  import Types
 from comine.misc.humans import Humans
+from comine.misc.vec    import numpy, U64
 from .errors            import ErrorChunk
 from .scale             import Scale
 from .chunk             import Chunk
@@ -57,7 +60,7 @@ class Guess(object):
                 left, spans = _extend(span)
 
                 if left is not None:
-                    new = s.__traverse_left(rg = left)
+                    new = s.__traverse_left(left, spans[0].exten())
 
                     if new is not None:
                         arena = span.exten().__arena__()
@@ -66,7 +69,7 @@ class Guess(object):
 
                         trans.make(rg = new, exten = exten)
 
-    def __traverse_left(s, rg):
+    def __traverse_left(s, rg, exten):
         '''
             Try to resolve range at left from an alias point. There is
             no way to traverse exactly chunks from right to left. Some
@@ -84,20 +87,14 @@ class Guess(object):
                 since all secondary arenas is contigous and w/o any holes.
         '''
 
-        last, nodes = rg[1], { rg[1]: [] }
-
-        fmask = Flags.MMAPPED | Flags.NON_MAIN_ARENA
-
-        for caret in Chunk(s.__sc, rg[1], Chunk.TYPE_LEFT, end = rg[0]):
-            probe = caret.__at__()
-
-            if last - probe > 1024*1024: break
+        last, nodes, limit = rg[1], { rg[1]: [] }, 1024*1024
 
-            if caret.flag(fmask):       continue
+        for probe, size in s.__left_chunks(rg, exten):
+            if last - probe > limit: break
 
-            if len(caret) > 1024*1024:  continue
+            if size is None: continue
 
-            links = nodes.get(probe + len(caret))
+            links = nodes.get(probe + size)
 
             if links is not None:
                 links.append(probe)
@@ -109,6 +106,57 @@ class Guess(object):
 
         return (left, rg[1] )if left < rg[1] else None
 
+    def __left_chunks(s, rg, exten, window = 2**20):
+        '''
+            Yields (probe, size) of left continuation candidates going
+            from right to left by OFFSET steps, reading memory in large
+            windows. All size words of window are decoded at once and
+            filtered by fit, flags and size, survivors yielded in the
+            descending order. After each window (probe, None) is given
+            with the next probe address to let caller stop traverse.
+        '''
+
+        atom, step, least = s.__sc.__layout__()[:3]
+
+        fmask = Flags.MMAPPED | Flags.NON_MAIN_ARENA
+
+        hi = rg[1]
+
+        while hi - step >= rg[0]:
+            lo = hi - step * (min(window, hi - rg[0]) // step)
+
+            words = s.__left_words(exten.view(lo, hi - lo), atom)
+
+            if numpy is not None:
+                size = words & ~numpy.uint64(0x7)
+
+                mask = (size >= least) & (size <= 1024*1024)
+                mask &= (words & fmask) == 0
+
+                for z in numpy.flatnonzero(mask)[::-1]:
+                    yield (lo + int(z) * step, int(size[z]))
+
+            else:
+                for z in xrange(len(words) - 1, -1, -1):
+                    word = words[z]; size = word ^ (word & 0x7)
+
+                    if least <= size <= 1024*1024 and not (word & fmask):
+                        yield (lo + z * step, size)
+
+            yield (lo - step, None)
+
+            hi = lo
+
+    @classmethod
+    def __left_words(cls, blob, atom):
+        ''' Size words of each OFFSET aligned chunk candidate in blob '''
+
+        if numpy is not None:
+            return numpy.frombuffer(blob, dtype = '<u%u' % atom)[1::2]
+
+        else:
+            return array(U64 if atom == 8 else 'I', str(blob))[1::2]
+
     def __resolve_left(s, at, nodes):
         ''' Analyse tree build while left traverse and give estimated
             left boundary for region.
@@ -153,7 +201,7 @@ class Guess(object):
             for place, spans in s.__world.physical(None, unused = s.__ring):
                 last, thresh = None, place[0]
 
-                for chunk in s.__mmaped_pages(place):
+                for chunk in s.__mmaped_pages(place, spans):
                     if thresh <= chunk.__at__():
                         if last is not None: _push(last)
 
@@ -166,13 +214,15 @@ class Guess(object):
 
                 if last is not None: _push(last)
 
-    def __mmaped_pages(s, place):
+    def __mmaped_pages(s, place, spans):
         page = s.__sc.__page__()
 
         _align = lambda x, m = page - 1: (x + m) ^ ((x + m) & m)
 
         if Tools.len(place) > 64 * 1024:
-            for at in xrange(_align(place[0]), place[1], page):
+            exten = spans[0].exten()
+
+            for at in s.__mmaped_probe(exten, (_align(place[0]), place[1])):
                 try:
                     chunk = Chunk(s.__sc, at, Chunk.TYPE_REGULAR)
 
@@ -182,3 +232,54 @@ class Guess(object):
 
                 except ErrorChunk as E:
                     pass
+
+    def __mmaped_probe(s, exten, rg, pages = 4096):
+        '''
+            Yields page addresses in rg that may start a mmapped chunk.
+            Memory is read in blocks of pages and size word at each page
+            is picked by strided view, flag and size tests are applied
+            over the whole block at once. Survivors are to be validated.
+        '''
+
+        atom, page = s.__sc.__atom__(), s.__sc.__page__()
+
+        least = s.__sc.__layout__()[2]
+
+        for base in xrange(rg[0], rg[1] - 2 * atom + 1, pages * page):
+            count = min(pages, (rg[1] - 2 * atom - base) // page + 1)
+
+            blob = exten.view(base, (count - 1) * page + 2 * atom)
+
+            words = s.__page_words(blob, count, page, atom)
+
+            if numpy is not None:
+                size = words & ~numpy.uint64(0x7)
+
+                ends = base + numpy.arange(count, dtype = 'u8') * page + size
+
+                mask = (words & Flags.MMAPPED).astype(bool)
+                mask &= (size >= least) & (ends <= rg[1])
+
+                for z in numpy.flatnonzero(mask):
+                    yield base + int(z) * page
+
+            else:
+                for z, word in enumerate(words):
+                    size = word ^ (word & 0x7)
+
+                    if word & Flags.MMAPPED and size >= least \
+                            and base + z * page + size <= rg[1]:
+                        yield base + z * page
+
+    @classmethod
+    def __page_words(cls, blob, count, page, atom):
+        ''' Size words of each page in blob, second word of page '''
+
+        if numpy is not None:
+            return numpy.ndarray(shape = (count, ), dtype = '<u%u' % atom,
+                        buffer = blob, offset = atom, strides = (page, ))
+
+        else:
+            words = array(U64 if atom == 8 else 'I', str(blob))
+
+            return words[1::page // atom]
@@ -2,7 +2,9 @@
 
 import gdb
 
-from itertools          import chain, ifilter
+from itertools          import chain
+from bisect             import bisect_left
+from multiprocessing    import Pool, cpu_count
 
 from comine.iface.heap  import IHeap, IPred
 from comine.core.heman  import HeMan
@@ -11,18 +13,22 @@ from comine.maps.alias  import Alias
 from comine.misc.humans import Humans
 from comine.misc.types  import Types
 from comine.heaps.pred  import _HNil
-from .errors			import ErrorDamaged
+from .errors			import ErrorDamaged, AnalysisError
 from .guess				import Guess
-from .arena				import Arena
+from .arena				import Arena, Known
 from .chunk				import Chunk
 from .exten				import EHeap
 from .scale				import Scale
+from .walk				import Walker, curb, curb_task
+from .table				import Table
 
 @HeMan.register
 class TheGlibcHeap(IHeap):
     ''' The GLibc heap validator and data miner '''
 
-    def __init__(s, log, infer):
+    STATE   = 2     # version of __state__() layout, arenas with free
+
+    def __init__(s, log, infer, state = None):
         frame   = gdb.selected_frame()
 
         props = [ ('upper', TheGlibcHeap.__fn_max_chunk, s) ]
@@ -34,10 +40,22 @@ class TheGlibcHeap(IHeap):
         s.__ring    = Ring(props = props)
         s.__arena   = []
         s.__mp      = frame.read_var('mp_')
+        s.__table   = None
+        s.__fresh   = state is None
 
         s.__sc = Scale(s.__libc, page = s.__disq_page_size())
 
+        s.__walk    = Walker(s.__sc.__layout__(), infer, infer.__order__())
+
         s.__log(4, 'heap page size=%ub' % s.__sc.__page__())
+
+        if state is not None:
+            s.__restore(state)
+
+        else:
+            s.__discover(frame)
+
+    def __discover(s, frame):
         s.__log(1, "building glibc arena list")
 
         arena = frame.read_var('main_arena')
@@ -53,6 +71,8 @@ class TheGlibcHeap(IHeap):
 
         s.__log(1, "heap has %i arena items" % len(s.__arena))
 
+        s.__curb_arenas()
+
         segment = s.__mp['sbrk_base']
 
         if segment.type.code != gdb.TYPE_CODE_PTR:
@@ -60,17 +80,70 @@ class TheGlibcHeap(IHeap):
 
         s.__ready = True
 
-        infer.__world__().push(s, s.__ring, provide = 'heap')
+        s.__infer.__world__().push(s, s.__ring, provide = 'heap')
+
+        Guess(s.__log, s.__infer.__world__(), s.__ring, sc = s.__sc)()
+
+        s.__examine_mmaps()
+
+    def __restore(s, state):
+        ''' Rebuilds heap from state saved by __state__() '''
+
+        s.__arena = map(lambda x: Known(*x), state['arenas'])
+
+        by_seq = dict(map(lambda x: (x.__seq__(), x), s.__arena))
+
+        with s.__ring.begin(auto = True) as trans:
+            for rg, tag, seq, alias in state['spans']:
+                exten = EHeap(by_seq.get(seq), tag = tag, alias = alias)
+
+                trans.make(rg = rg, exten = exten)
+
+        s.__ready = True
+
+        s.__infer.__world__().push(s, s.__ring, provide = 'heap')
 
-        Guess(log, s.__infer.__world__(), s.__ring, sc = s.__sc)()
+        s.__log(1, 'restored %i arenas and %i fragments'
+                    % (len(s.__arena), len(s.__ring)))
 
         s.__examine_mmaps()
 
+    def __state__(s):
+        def _span(span):
+            exten = span.exten()
+
+            arena = exten.__arena__()
+
+            seq = None if arena is None else arena.__seq__()
+
+            return (span.__rg__(), exten.__tag__(), seq, list(exten))
+
+        arenas = map(lambda x: (x.__seq__(), long(x.__at__()), x.__free__()),
+                        s.__arena)
+
+        return { 'version' : TheGlibcHeap.STATE, 'arenas' : arenas,
+                    'spans' : map(_span, s.__ring.enum()) }
+
+    @classmethod
+    def restore(cls, log, infer, state):
+        '''
+            Restores heap from the state of the same layout version,
+            older states lack free chunks of arenas needed to tell free
+            chunks in enum() and lookup(), full discovery is done then.
+        '''
+
+        if state.get('version') == TheGlibcHeap.STATE:
+            return cls(log, infer, state = state)
+
+        log(1, 'heap state v%s is outdated' % state.get('version'))
+
     @classmethod
     def __who__(cls):   return 'glibc'
 
     def __ready__(s):   return s.__ready
 
+    def __page__(s):    return s.__sc.__page__()
+
     def __disq_page_size(s):
         _pre_2_17 = lambda : s.__mp['pagesize']
 
@@ -113,7 +186,80 @@ class TheGlibcHeap(IHeap):
                 return True
 
     def __make_arena(s, _arena, seq):
-        return Arena(s.__sc, _arena, seq, s.__ring, s.__log, s.__infer)
+        return Arena(s.__sc, _arena, seq, s.__ring, s.__log, s.__infer,
+                        defer = (seq > 0))
+
+    def __curb_arenas(s):
+        '''
+            Curbs wilds of secondary arenas deferred on arena discovery.
+            Each wild is independent, so with core image at hand they
+            are walked in a pool of processes reading the image directly.
+            Fragments are merged into the ring in a single transaction.
+            Arenas with damaged wild are dropped the same way as arenas
+            failed on discovery.
+        '''
+
+        arenas = filter(lambda x: x.__wild__() is not None, s.__arena)
+
+        image = s.__curb_image(arenas)
+
+        layout = s.__sc.__layout__()
+
+        if image is not None and len(arenas) > 1:
+            tasks = map(lambda x: (image.__path__(), layout) + x.__wild__(),
+                            arenas)
+
+            pool = Pool(min(len(tasks), cpu_count()))
+
+            try:
+                result = pool.map(curb_task, tasks)
+
+            except Exception as E:
+                raise AnalysisError('arenas curb pool failed, %s' % E)
+
+            finally:
+                pool.terminate()
+
+        else:
+            walk = Walker(layout, s.__infer, s.__infer.__order__())
+
+            result = map(lambda x: curb(walk, *x.__wild__()), arenas)
+
+        with s.__ring.begin(auto = True) as trans:
+            for arena, (spans, error) in zip(arenas, result):
+                if error is not None:
+                    s.__log(1, 'cannot add arena at 0x%x, error %s'
+                                % (arena.__at__(), error))
+
+                    s.__arena.remove(arena)
+
+                    continue
+
+                alias, found = arena.__wild__()[2], 0
+
+                for rg in spans:
+                    a, b = map(lambda x: bisect_left(alias, x), rg)
+
+                    exten = EHeap(arena, alias = alias[a:b])
+
+                    trans.make(rg = rg, exten = exten)
+
+                    found += rg[1] - rg[0]
+
+                s.__log(1, 'arena #%i has at most of %s unresolved data'
+                        % (arena.__seq__(),
+                            Humans.bytes(arena.__sysmem__() - found)))
+
+    def __curb_image(s, arenas):
+        core = s.__infer.__core__()
+
+        image = core and core.__image__()
+
+        for arena in arenas:
+            if image is None or not image.covers(arena.__wild__()[0]):
+                return None
+
+        return image
 
     def __examine_mmaps(s):
         ''' Analyse mmap() settings for the heap.
@@ -151,6 +297,55 @@ class TheGlibcHeap(IHeap):
             s.__log(1, 'heap has %s in %i mmaps(), %s'
                 % (Humans.bytes(s.__mmapped), s.__mmaps, status))
 
+    def __chunks(s):
+        '''
+            Chunk table made on the first lookup. Table cached for the
+            same core is used only for restored heap, fresh discovery
+            always rebuilds it.
+        '''
+
+        if s.__table is None:
+            s.__table = s.__chunk_table(build = s.__fresh)
+
+        return s.__table
+
+    def __chunk_table(s, build = False):
+        layout = s.__infer.__layout__()
+
+        ident = layout and layout.__ident__()
+
+        path = ident and (layout.special('cache') + '/chunks.glibc')
+
+        table = path and not build and Table.load(path, ident)
+
+        if table:
+            s.__log(1, 'loaded table of %i chunks' % len(table))
+
+        else:
+            table = Table.build(s.__walk, s.__ring.enum(), s.__log)
+
+            s.__log(1, 'built table of %i chunks' % len(table))
+
+            if path: table.save(path, ident)
+
+        return table
+
+    def __is_free(s, seq, at):
+        ''' True if chunk at addr is known free in arena with seq '''
+
+        arena = s.__arena_by_seq(seq)
+
+        return arena is not None and arena.is_free(at)
+
+    def __arena_by_seq(s, seq):
+        ''' Arena with given seq, list may have holes of dropped ones '''
+
+        if 0 <= seq < len(s.__arena) and s.__arena[seq].__seq__() == seq:
+            return s.__arena[seq]
+
+        for arena in s.__arena:
+            if arena.__seq__() == seq: return arena
+
     def __arena_by_addr(s, at):
         for arena in s.__arena:
             if long(arena.__at__()) == long(at): return arena
@@ -159,18 +354,41 @@ class TheGlibcHeap(IHeap):
         proximity, rg = s.__ring.lookup(at, exact = False)
 
         if proximity == Ring.MATCH_EXACT:
-            return s.__lookup_rg(at, rg)
+            z = s.__chunks().find(at)
+
+            if z is not None:
+                return s.__lookup_table(at, z)
+
+            else:   # table may be incomplete on damaged fragments
+                meta = s.__lookup_rg(at, rg)
+
+                if meta is not None: return meta
 
         return (IHeap.REL_OUTOF, None, None, None, None)
 
+    def __lookup_table(s, at, z):
+        start, size, flags, seq = s.__table[z]
+
+        relation, offset = s.__walk.relation(start, size, at)
+
+        if flags & Table.FL_HUGE:
+            relation = IHeap.REL_HUGE
+
+        elif relation == IHeap.REL_CHUNK and s.__is_free(seq, start):
+            relation = IHeap.REL_FREE
+
+        first, size, gran = s.__walk.meta(start, size)
+
+        return (relation, first, offset, size, gran)
+
     def __lookup_rg(s, at, span):
         alias = span.exten().lookup(at, alias = Alias.ALIAS_BEFORE)
 
         s.__log(8, 'alias at 0x%x, distance=%s'
                     % (alias, Humans.bytes(at - alias)))
 
-        for chunk in Chunk(s.__sc, alias, Chunk.TYPE_REGULAR):
-            relation, offset = chunk.relation(at)
+        for start, size, _ in s.__walk((alias, span.__rg__()[1])):
+            relation, offset = s.__walk.relation(start, size, at)
 
             if relation == IHeap.REL_OUTOF:
                 continue
@@ -178,10 +396,15 @@ class TheGlibcHeap(IHeap):
             elif span.exten().__tag__() == EHeap.TAG_MMAPPED:
                 relation = IHeap.REL_HUGE
 
-            else:
-                pass # TODO: lookup fastbin slots and top chunk
+            elif relation == IHeap.REL_CHUNK:
+                arena = span.exten().__arena__()
+
+                if arena is not None and arena.is_free(start):
+                    relation = IHeap.REL_FREE
+
+            first, size, gran = s.__walk.meta(start, size)
 
-            return (relation, chunk.inset(), offset) + chunk.__netto__()
+            return (relation, first, offset, size, gran)
 
     def enum(s, place = None, pred = None, huge = None):
         pred = Types.ensure(pred, IPred, none = True)
@@ -195,15 +418,17 @@ class TheGlibcHeap(IHeap):
 
                     rel = IHeap.REL_HUGE if mmapped else IHeap.REL_CHUNK
 
-                    start, end = span.__rg__()
+                    arena = span.exten().__arena__()
 
-                    it = Chunk(s.__sc, start, Chunk.TYPE_REGULAR, end = end)
+                    for at, size, used in s.__walk(span.__rg__()):
+                        if arena is not None and arena.is_free(at):
+                            continue
 
-                    for chunk in ifilter(lambda x: x.is_used(), it):
-                        meta = (rel, ) + chunk.meta()
+                        if used:
+                            meta = (rel, ) + s.__walk.meta(at, size)
 
-                        if not pred or pred(*meta):
-                            yield meta
+                            if not pred or pred(*meta):
+                                yield meta
 
     def __enums_rg_cond(s, huge):
         return s.__rg_for_huge(huge), s.__ring_pred_for(huge)
@@ -38,6 +38,10 @@ class Scale(Frozen):
 
     def __atom__(s):    return s.__atom
 
+    def __layout__(s):  # -> (atom, offset, min, fence, brutt, align)
+        return (s.__atom, s.OFFSET, s.__MIN, s.__FENCE, s.__BRUTT,
+                    s.__ALIGN)
+
     def __str__(s):
         return 'Metrics(%u, page=%u)' % (s.__atom, s.__page)
 
@@ -0,0 +1,107 @@
+#__ LGPL 3.0, 2026 Alexander Soloviev (no.friday@yandex.ru)
+
+from array      import array
+from bisect     import bisect_right
+from struct     import Struct
+from os         import rename
+
+from comine.misc.vec    import U64
+from .errors            import ErrorChunk
+from .exten             import EHeap
+
+
+class Table(object):
+    '''
+        Sorted table of all chunks in known heap fragments kept in
+        flat arrays as (start, size, flags, arena). Gives lookup of
+        chunk by address with a single bisect and may be persisted
+        in cache keyed by core identity.
+    '''
+
+    FL_USED     = 0x01  # chunk is in use by its next neighbour
+    FL_LAST     = 0x02  # last chunk of fragment, usage is unknown
+    FL_HUGE     = 0x04  # mmap()'ed chunk
+
+    __HEAD  = Struct('8s64sQ')
+    __MAGIC = 'CMCHT\x00\x00\x01'
+
+    def __init__(s, start, size, flags, arena):
+        s.__start   = start
+        s.__size    = size
+        s.__flags   = flags
+        s.__arena   = arena
+
+    def __len__(s):     return len(s.__start)
+
+    def __getitem__(s, z):  # -> (start, size, flags, arena)
+        return (s.__start[z], s.__size[z], s.__flags[z], s.__arena[z])
+
+    def find(s, at):
+        ''' Returns index of chunk holding given address or None '''
+
+        z = bisect_right(s.__start, at) - 1
+
+        if z >= 0 and at < s.__start[z] + s.__size[z]:
+            return z
+
+    @classmethod
+    def build(cls, walk, spans, log):
+        table = (array(U64), array(U64), array('B'), array('h'))
+
+        for span in spans:
+            exten = span.exten()
+
+            arena = exten.__arena__()
+
+            seq = -1 if arena is None else arena.__seq__()
+
+            huge = Table.FL_HUGE if exten.__tag__() == EHeap.TAG_MMAPPED else 0
+
+            try:
+                for at, size, used in walk(span.__rg__()):
+                    flag = Table.FL_LAST if used is None else int(used)
+
+                    table[0].append(at)
+                    table[1].append(size)
+                    table[2].append(flag | huge)
+                    table[3].append(seq)
+
+            except ErrorChunk as E:
+                log(1, 'chunk table of %s is incomplete, %s' % (span, E))
+
+        return cls(*table)
+
+    @classmethod
+    def load(cls, path, ident):
+        ''' Returns table saved for the same ident or None '''
+
+        try:
+            F = open(path, 'rb')
+
+        except IOError as E:
+            return None
+
+        with F:
+            magic, mark, count = cls.__HEAD.unpack(F.read(cls.__HEAD.size))
+
+            if magic != cls.__MAGIC or mark.rstrip('\0') != ident:
+                return None
+
+            table = (array(U64), array(U64), array('B'), array('h'))
+
+            try:
+                for seq in table: seq.fromfile(F, count)
+
+            except EOFError as E:
+                return None
+
+            return cls(*table)
+
+    def save(s, path, ident):
+        with open(path + '~', 'wb') as F:
+            F.write(Table.__HEAD.pack(Table.__MAGIC, ident, len(s)))
+
+            for seq in (s.__start, s.__size, s.__flags, s.__arena):
+                seq.tofile(F)
+
+        rename(path + '~', path)
@@ -0,0 +1,336 @@
+#__ LGPL 3.0, 2026 Alexander Soloviev (no.friday@yandex.ru)
+
+from struct             import Struct
+from bisect             import bisect_left
+
+from comine.arch.elf    import Image, Reader
+from comine.iface.heap  import IHeap
+from .errors            import ErrorChunk, AnalysisError
+from .defs              import Flags
+
+
+class Walker(object):
+    '''
+        Fast left to right chunks walker over raw memory blocks. Reads
+        memory in large windows and decodes size words with struct, no
+        gdb.Value casts per chunk. Has the same semantic as regular
+        Chunk() traverse with is_used() filter and fence detection.
+        Words are decoded in target byte order given by struct prefix.
+    '''
+
+    def __init__(s, layout, infer, order = '<', block = 2**20):
+        atom, s.__offset, s.__min, s.__fence, s.__brutt, s.__align = layout
+
+        s.__infer   = infer
+        s.__block   = block
+        s.__atom    = atom
+        s.__stop    = None
+        s.__minett  = s.__min - s.__brutt
+        s.__word    = Struct(order + ('Q' if atom == 8 else 'I'))
+        s.__buf     = ''
+        s.__base    = 0
+
+    def __call__(s, rg):    # -> (at, size, used)
+        '''
+            Yields (at, size, used) for each chunk starting at rg[0]
+            till rg[1], end may be None for unbound traverse. used is
+            None for the last chunk before end as its in use flag is
+            kept in the next one. Traverse stop point is kept for
+            __stop__() call.
+        '''
+
+        at, end = rg
+
+        s.__stop = None
+
+        word = s.__read(at, end)
+
+        if (word ^ (word & 0x7)) < s.__min:
+            raise ErrorChunk(_Raw(at), 'Invalid chunk size %ib' % word)
+
+        while True:
+            size = word ^ (word & 0x7)
+
+            after = at + size
+
+            if end is not None and after >= end:
+                yield (at, size, True if word & Flags.MMAPPED else None)
+
+                s.__stop = after
+
+                return
+
+            near = s.__read(after, end)
+
+            if word & Flags.MMAPPED:
+                yield (at, size, True)
+
+            else:
+                yield (at, size, bool(near & Flags.PREV_IN_USE))
+
+            nsize = near ^ (near & 0x7)
+
+            if size == s.__fence and nsize == s.__fence \
+                        and near & Flags.PREV_IN_USE:
+                s.__stop = at
+
+                return
+
+            if nsize < s.__fence:
+                raise ErrorChunk(_Raw(after), 'Invalid chunk size %ib' % near)
+
+            at, word = after, near
+
+    def __stop__(s):
+        ''' Address of chunk where last traverse was stopped '''
+
+        return s.__stop
+
+    def meta(s, at, size):  # -> (first, size, granularity)
+        size -= s.__brutt
+
+        gran = s.__align if size > s.__minett else s.__minett
+
+        return (at + s.__offset, size, gran)
+
+    def relation(s, at, size, to):
+        ''' Give relation of given address to chunk (at, size) '''
+
+        a = to - at
+
+        if not (0 <= a < size):
+            return (IHeap.REL_OUTOF, a)
+
+        elif a < s.__offset:
+            return (IHeap.REL_HEAD, a - s.__offset)
+
+        else:
+            return (IHeap.REL_CHUNK, a - s.__offset)
+
+    def __read(s, at, end):
+        ''' Returns size word of chunk at given address '''
+
+        off = at + s.__atom - s.__base
+
+        if not (0 <= off and off + s.__atom <= len(s.__buf)):
+            size = s.__block if end is None else min(s.__block, end - at)
+
+            s.__base = at
+            s.__buf = s.__infer.readvar(at, max(size, 2 * s.__atom), False)
+
+            off = s.__atom
+
+            if s.__buf is None:
+                s.__buf = ''
+
+                raise ErrorChunk(_Raw(at), 'cannot read memory')
+
+        return s.__word.unpack_from(s.__buf, off)[0]
+
+
+class Lists(object):
+    '''
+        Reader of arena free lists, bins and fastbins, over raw memory.
+        Follows fd links decoding chunk words with struct, no gdb.Value
+        casts per chunk. Applies the same checks as Chunk() does for
+        TYPE_BIN and TYPE_FAST traverse.
+    '''
+
+    FAST_LIMIT  = 512
+
+    def __init__(s, layout, infer, order = '<'):
+        atom, _, s.__min, s.__fence, _, _ = layout
+
+        s.__infer   = infer
+        s.__atom    = atom
+        s.__order   = order
+        s.__code    = 'Q' if atom == 8 else 'I'
+        s.__words   = Struct(order + '4' + s.__code)
+
+    def heads(s, at, count):
+        ''' Reads array of count chunk pointers at given address '''
+
+        blob = s.__read(at, count * s.__atom)
+
+        form = '%s%u%s' % (s.__order, count, s.__code)
+
+        return list(Struct(form).unpack_from(blob))
+
+    def fast(s, at):    # -> (at, size)
+        ''' Yields chunks of fastbin list starting at given chunk '''
+
+        size = s.__size(at, fence = False)
+
+        s.__check_fast(at, size)
+
+        while True:
+            yield (at, size)
+
+            fd = s.__chunk(at)[2]
+
+            if fd == 0x0: return
+
+            word = s.__chunk(fd)[1]
+
+            if word ^ (word & 0x7) != size:
+                raise Exception('Invalid fastbin chunk size')
+
+            s.__check_fast(fd, size)
+
+            at = fd
+
+    def bin(s, at, end, queue, fence):  # -> (at, size)
+        '''
+            Yields chunks of bin list from given first chunk till end
+            one. Fence points of chunks before arena gaps are appended
+            to fence list.
+        '''
+
+        size = s.__size(at, fence = False)
+
+        s.__check_bin(at, size, queue, fence)
+
+        while True:
+            yield (at, size)
+
+            fd = s.__chunk(at)[2]
+
+            if fd == end: return
+
+            if s.__chunk(fd)[3] != at:
+                raise Exception('Invalid bin chunk linkage')
+
+            size = s.__size(fd, fence = True)
+
+            s.__check_bin(fd, size, queue, fence)
+
+            at = fd
+
+    def __check_fast(s, at, size):
+        if size >= Lists.FAST_LIMIT:
+            raise Exception('Invalid size %i of fastbin chunk' % size)
+
+        s.__size(at + size, fence = True)
+
+        if not s.__chunk(at + size)[1] & Flags.PREV_IN_USE:
+            raise Exception('Invalid fastbin chunk')
+
+    def __check_bin(s, at, size, queue, fence):
+        if queue > 0 or queue is None:
+            if not s.__chunk(at)[1] & Flags.PREV_IN_USE:
+                raise Exception('Invalid bin chunk')
+
+            caret = at + size
+
+            prev, word = s.__chunk(caret)[:2]
+
+            s.__size(caret, fence = True)
+
+            if word & Flags.PREV_IN_USE:
+                raise Exception('Invalid bin chunk')
+
+            if prev != size:
+                raise Exception('Invalid bin cunk')
+
+            after = caret + (word ^ (word & 0x7))
+
+            near = s.__chunk(after)[1]
+
+            if word ^ (word & 0x7) == s.__fence \
+                    and near ^ (near & 0x7) == s.__fence \
+                    and near & Flags.PREV_IN_USE:
+                fence.append(caret)
+
+            else:
+                s.__size(after, fence = True)
+
+                if not near & Flags.PREV_IN_USE:
+                    raise ErrorChunk(_Raw(after), 'Invalid bin chunk')
+
+    def __size(s, at, fence):
+        ''' Gives chunk size checked against minimal or fence size '''
+
+        word = s.__chunk(at)[1]
+
+        size = word ^ (word & 0x7)
+
+        if size < (s.__fence if fence else s.__min):
+            raise ErrorChunk(_Raw(at), 'Invalid chunk size %ib' % size)
+
+        return size
+
+    def __chunk(s, at):     # -> (prev_size, size, fd, bk)
+        return s.__words.unpack_from(s.__read(at, s.__words.size))
+
+    def __read(s, at, size):
+        blob = s.__infer.readvar(at, size, False)
+
+        if blob is None:
+            raise ErrorChunk(_Raw(at), 'cannot read memory')
+
+        return blob
+
+
+def curb(walk, wild, fence, alias):
+    '''
+        Converts contiguous wild of arena to known fragments walking
+        chunks from left to right up to each fence point, the same
+        way as Arena does it over Chunk(). Returns list of fragments
+        and error string if the wild was not exhausted.
+    '''
+
+    (start, end), fence, spans = wild, sorted(fence), []
+
+    try:
+        while len(fence) > 0:
+            if start >= fence[0]: raise AnalysisError('DUNNO')
+
+            for _ in walk((start, fence[0])): pass
+
+            stop = walk.__stop__()
+
+            if stop == fence[0]: fence.pop(0)
+
+            if stop <= start: break
+
+            spans.append((start, stop)); start = stop
+
+            if start >= end: break
+
+            z = bisect_left(alias, stop)
+
+            if z < len(alias):
+                start = alias[z]
+
+            else:
+                raise AnalysisError('no alias points before fence')
+
+        if start < end:
+            raise AnalysisError('the wild 0x%x-0x%x was not exhausted'
+                                    % (start, end))
+
+    except (AnalysisError, ErrorChunk) as E:
+        return spans, str(E)
+
+    return spans, None
+
+def curb_task(task):
+    ''' Pool worker, curbs arena wild reading core image directly '''
+
+    core, layout, wild, fence, alias = task
+
+    image = Image(core)
+
+    walk = Walker(layout, Reader(image), image.__order__())
+
+    return curb(walk, wild, fence, alias)
+
+
+class _Raw(object):
+    ''' Chunk placeholder for ErrorChunk() reports '''
+
+    __slots__ = ('_Raw__at', )
+
+    def __init__(s, at):    s.__at = at
+
+    def __at__(s):          return s.__at
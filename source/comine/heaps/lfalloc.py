@@ -3,6 +3,9 @@
 import gdb
 
 from itertools          import chain, count
+from array              import array
+from bisect             import bisect_left
+
 from comine.core.heman  import HeMan, IHeap
 from comine.maps.exten  import IExten
 from comine.maps.ring   import Ring
@@ -10,6 +13,7 @@ from comine.maps.tools  import Tools
 from comine.heaps.pred  import _HNil
 from comine.misc.humans import Humans
 from comine.misc.func   import gmap
+from comine.misc.vec    import U64, numpy
 
 @HeMan.register
 class TheLfAlloc(IHeap):
@@ -37,10 +41,11 @@ class TheLfAlloc(IHeap):
         assert s.__page & s.__mask == 0
 
         s.__s2blo   = None  # small blocks enum, { index -> [ block ] }
-        s.__b2free  = None  # small free chunks, { block -> bitmap }
+        s.__b2free  = None  # small free chunks, _BMap() of all blocks
         s.__intern  = set() # chunks of global free lists, [ chunk ]
+        s.__invec   = None  # sorted numpy array of __intern chunks
 
-        s.__index   = rvar('chunkSizeIdx')
+        s.__index   = s.__read_array(rvar('chunkSizeIdx'))
         s.__lfree   = rvar('lbFreePtrs')
         s.__fe_tls  = rvar('pThreadInfoList')
         s.__fe_glob = rvar('globalFreeLists')
@@ -86,17 +91,39 @@ class TheLfAlloc(IHeap):
 
     def __ready__(s):   return s.__ready
 
+    def __page__(s):    return s.__page
+
+    def __read_array(s, var, code = None):
+        '''
+            Reads gdb array variable as raw memory at once to plain
+            array, so hot paths do not touch gdb values at all. Items
+            are signed integers of the target type size if no code
+            is given explicitly.
+        '''
+
+        size = var.type.target().sizeof
+
+        seq = array(code or { 1: 'b', 2: 'h', 4: 'i', 8: 'l' }[size])
+
+        if seq.itemsize != size:
+            raise Exception('cannot map %ub items of %s' % (size, var.type))
+
+        at = s.__libc.addr(var.address)
+
+        seq.fromstring(s.__infer.readvar(at, var.type.sizeof, False))
+
+        return seq
+
     def __traverse_size_info(s, rvar):
         sizes, heads = map(rvar, ['nSizeIdxToSize', 'globalCurrentPtr' ])
 
-        def _h2info(slot):
-            at = s.__libc.addr(heads[slot])
-
+        def _h2info(at):
             return (s.__block_for(at), at)
 
-        s.__heads = map(_h2info, xrange(heads.type.range()[1] + 1))
-        s.__sizes = map(lambda x: int(sizes[x]),
-                        xrange(sizes.type.range()[1] + 1))
+        s.__heads = map(_h2info, s.__read_array(heads, code = U64))
+        s.__sizes = map(int, s.__read_array(sizes))
+
+        s.__build_size_lut()
 
         items = lambda x: int(TheLfAlloc.BLOCKS / x)
         waste = lambda x: (items(x) * x) if x > 0 else  None
@@ -114,8 +141,32 @@ class TheLfAlloc(IHeap):
                 % (len(s.__sizes) - 1, s.__sizes[1], s.__sizes[-1],
                     fvecb, s.__round(fvecb), s.__fvidx))
 
+    def __build_size_lut(s, limit = 4096):
+        '''
+            Precomputes size to index table for sizes up to limit and
+            (size, gran) pairs of each index. Larger sizes are resolved
+            by bisect over sorted sizes of buckets.
+        '''
+
+        if any(map(lambda x, y: x > y, s.__sizes, s.__sizes[1:])):
+            raise Exception('size buckets are not sorted')
+
+        s.__lut, z = array('h'), 0
+
+        for size in xrange(min(limit, s.__sizes[-1]) + 1):
+            while s.__sizes[z] < size: z += 1
+
+            s.__lut.append(z)
+
+        def _granz(index):
+            size = s.__sizes[index]
+
+            return (size, size - (index > 1 and s.__sizes[index - 1]))
+
+        s.__gtab = map(_granz, xrange(len(s.__sizes)))
+
     def __traverse_small_map(s):
-        items = s.__index.type.range()[1] + 1
+        items = len(s.__index)
 
         s.__s2blo = { block : [ ] for block in xrange(-1, len(s.__sizes)) }
 
@@ -181,7 +232,7 @@ class TheLfAlloc(IHeap):
 
                 lvl = [ 1, _o4, _o2, _o2 + _o4, caps ]
 
-                for num in map(lambda x: len(s.__b2free[x]), blocks):
+                for num in map(s.__b2free.count, blocks):
                     unused += num
                     touch[0] += bool(num >= lvl[0])
                     touch[1] += bool(num >= lvl[1])
@@ -211,10 +262,10 @@ class TheLfAlloc(IHeap):
                 % (Humans.bytes(s.__unused), blocks, listed, s.__efblk))
 
     def __traverse_free_small(s):
-        _items = lambda x: int(TheLfAlloc.BLOCKS/ x)
+        _items = lambda x: int(TheLfAlloc.BLOCKS/ s.__sizes[x])
         _caps = lambda x: _items(s.__index[x]) if s.__index[x] > 0 else 0
 
-        s.__b2free = [ _BMap(_caps(x)) for x in xrange(s.__upper + 1) ]
+        s.__b2free = _BMap(map(_caps, xrange(s.__upper + 1)))
 
         for name in ('tls', 'glob'):
             was = s.__stat_on_free((0, 0, 0))
@@ -230,6 +281,9 @@ class TheLfAlloc(IHeap):
 
         s.__traverse_free_pages(lambda x: None, s.__fe_page)
 
+        if numpy is not None:
+            s.__invec = numpy.array(sorted(s.__intern), dtype = numpy.uint64)
+
         s.__log(1, "found %s in internal %u free vecs"
                     % (Humans.bytes(128 * len(s.__intern)), len(s.__intern)))
 
@@ -301,17 +355,17 @@ class TheLfAlloc(IHeap):
             else:
                 off = int((at % TheLfAlloc.BLOCKS) / s.__sizes[index])
 
-                if s.__b2free[block].add(off):
+                if s.__b2free.add(block, off):
                     s.__esame += 1
 
     def __stat_on_free(s, was):
         items, volume, failed = 0, 0, (s.__esame + s.__esmall + s.__esize)
 
-        it = gmap(lambda x: int(s.__index[x]), xrange(s.__upper + 1))
+        for block in xrange(s.__upper + 1):
+            sinx, num = s.__index[block], s.__b2free.count(block)
 
-        for bmap, sinx in zip(s.__b2free, it):
             if sinx > 0:
-                items += len(bmap); volume += len(bmap) * s.__sizes[sinx]
+                items += num; volume += num * s.__sizes[sinx]
 
         return (items - was[0], volume - was[1], failed - was[2])
 
@@ -439,7 +493,7 @@ class TheLfAlloc(IHeap):
                     rel, size = IHeap.REL_INTERN, BLOCKS - s.__waste[index]
                 elif s.__b2free is None:
                     rel = IHeap.REL_MAYBE
-                elif s.__b2free[block].__has__(item):
+                elif s.__b2free.__has__(block, item):
                     rel = IHeap.REL_FREE
 
             return (rel, chunk, at - chunk, size, gran)
@@ -450,21 +504,25 @@ class TheLfAlloc(IHeap):
         return (IHeap.REL_OUTOF, None, None, None, None)
 
     def enum(s, place = None, pred = None, huge = None):
-        def _filter(it):
-            for block, rg, index in it:
-                is_free_item = s.__b2free[block].__has__
-                size, gran = s.__granz(index)
+        if numpy is not None:
+            it = s.enum_arrays(place, pred, huge)
+
+            return ((rel, x, size, gran) for rel, at, size, gran in it
+                                            for x in at.tolist())
+
+        return s.__enum(place, pred, huge, s.__enum_items, lambda x: x)
+
+    def enum_arrays(s, place = None, pred = None, huge = None):
+        ''' Yields used chunks of each small block in one array '''
+
+        if numpy is None:
+            return IHeap.enum_arrays(s, place, pred, huge)
 
-                for item, at in zip(count(), xrange(rg[0], rg[1], size)):
-                    meta = (IHeap.REL_CHUNK, at, size, gran)
+        _wrap = lambda x: (x[0], numpy.array(x[1:2], numpy.uint64)) + x[2:]
 
-                    if is_free_item(item):
-                        pass
-                    elif index == s.__fvidx and at in s.__intern:
-                        pass
-                    elif pred is None or pred(*meta):
-                        yield meta
+        return s.__enum(place, pred, huge, s.__enum_block, _wrap)
 
+    def __enum(s, place, pred, huge, func, wrap):
         with (pred or _HNil()).begin(s.__round) as pred:
             sizes, cond = s.__enums_rg_cond(huge)
 
@@ -475,12 +533,14 @@ class TheLfAlloc(IHeap):
                     if exten.__tag__() == EHeap.TAG_SMALL:
                         it = s.__enum_small(span.__rg__())
 
-                        for meta in _filter(it): yield meta
+                        for block, rg, index in it:
+                            for meta in func(block, rg, index, pred):
+                                yield meta
 
                     elif exten.__tag__() == EHeap.TAG_MMAP:
                         meta = s.__huge_meta(span)
 
-                        if not pred or pred(*meta): yield meta
+                        if not pred or pred(*meta): yield wrap(meta)
 
     def __enum_small(s, rg):
         start, end = map(s.__block_for, (rg[0], rg[1] - 1))
@@ -500,6 +560,55 @@ class TheLfAlloc(IHeap):
 
                 yield block, place, index
 
+    def __enum_items(s, block, rg, index, pred):
+        is_free_item = lambda x: s.__b2free.__has__(block, x)
+        size, gran = s.__granz(index)
+
+        for item, at in zip(count(), xrange(rg[0], rg[1], size)):
+            meta = (IHeap.REL_CHUNK, at, size, gran)
+
+            if is_free_item(item):
+                pass
+            elif index == s.__fvidx and at in s.__intern:
+                pass
+            elif pred is None or pred(*meta):
+                yield meta
+
+    def __enum_block(s, block, rg, index, pred):
+        '''
+            Vectorized enum of used chunks in small block. Addresses of
+            used items are taken from free bitmap of block at once, then
+            internal free vecs and predicate mask are applied to array.
+            Gives a single (rel, at, size, gran) batch with at array.
+        '''
+
+        size, gran = s.__granz(index)
+
+        items = (rg[1] - rg[0] + size - 1) // size
+
+        used = numpy.flatnonzero(~s.__b2free.free(block, items))
+
+        at = used.astype(numpy.uint64) * numpy.uint64(size) \
+                + numpy.uint64(rg[0])
+
+        if index == s.__fvidx and len(s.__invec) > 0:
+            z = numpy.searchsorted(s.__invec, at)
+
+            z = numpy.minimum(z, len(s.__invec) - 1)
+
+            at = at[s.__invec[z] != at]
+
+        mask = pred.mask(IHeap.REL_CHUNK, at, size, gran)
+
+        if numpy.ndim(mask) > 0:
+            at = at[mask]
+
+        elif not mask:
+            return
+
+        if len(at) > 0:
+            yield (IHeap.REL_CHUNK, at, size, gran)
+
     def __huge_meta(s, span, at = None):
         T2REL = { EHeap.TAG_FREE: IHeap.REL_FREE,
                     EHeap.TAG_MMAP: IHeap.REL_HUGE }
@@ -549,18 +658,19 @@ class TheLfAlloc(IHeap):
             return s.__index[block], block
 
     def __index_for_size(s, size):
-        for z in xrange(0, len(s.__sizes)):
-            if size <= s.__sizes[z]: return z
+        if 0 <= size < len(s.__lut):
+            return s.__lut[size]
+
+        z = bisect_left(s.__sizes, size)
+
+        if z < len(s.__sizes): return z
 
     def __block_for(s, at):     # -> place | None
         if s.__small[0] <= at < s.__small[1]:
             return int(at / TheLfAlloc.BLOCKS)
 
     def __granz(s, index):      # -> size, gran
-        size    = s.__sizes[index]
-        gran    = size - (index >  1 and s.__sizes[index - 1])
-
-        return (size, gran)
+        return s.__gtab[index]
 
     @classmethod
     def __fn_max_chunk(cls, ring, heap):
@@ -571,28 +681,54 @@ class TheLfAlloc(IHeap):
 
 
 class _BMap(object):
-    __slots__ = ('_BMap__caps', '_BMap__used', '_BMap__map');
+    '''
+        Free items bitmaps of all small blocks kept in one contiguous
+        buffer, block bitmaps are placed one by one at byte offsets.
+        Item x is bit (0x80 >> (x & 7)) of byte (x >> 3), the same bit
+        order as numpy.unpackbits() gives.
+    '''
+
+    __slots__ = ('_BMap__off', '_BMap__used', '_BMap__map');
 
     def __init__(s, caps):
-        s.__caps    = (caps + 7) >> 3
-        s.__used    = 0
-        s.__map     = None
+        s.__off     = array('l', [0])
+        s.__used    = array('l', [0]) * len(caps)
+
+        for num in caps: s.__off.append(s.__off[-1] + ((num + 7) >> 3))
 
-    def __has__(s, x):  return s.__used and s.__map[x >> 3] & (1 << (x & 0x7))
+        s.__map     = bytearray(s.__off[-1])
 
-    def __len__(s):     return s.__used
+    def __has__(s, block, x):
+        if s.__used[block]:
+            at = s.__off[block] + (x >> 3)
 
-    def add(s, num):
-        num, mask = (num >> 3), (1 << (num & 0x7))
+            return s.__map[at] & (0x80 >> (x & 0x7))
 
-        if s.__used == 0: s.__map = bytearray(s.__caps)
+    def count(s, block):    return s.__used[block]
 
-        if not (s.__map[num] & mask):
-            s.__map[num] |= mask
-            s.__used += 1
+    def add(s, block, num):
+        at, mask = s.__off[block] + (num >> 3), (0x80 >> (num & 0x7))
+
+        if not (s.__map[at] & mask):
+            s.__map[at] |= mask
+            s.__used[block] += 1
         else:
             return True
 
+    def free(s, block, items):
+        ''' Bool array of free flags for first items of block '''
+
+        a, b = s.__off[block], s.__off[block + 1]
+
+        bits = numpy.frombuffer(s.__map, dtype = numpy.uint8)[a:b]
+
+        free = numpy.unpackbits(bits)[:items].astype(bool)
+
+        if len(free) < items:
+            free = numpy.append(free, numpy.zeros(items - len(free), bool))
+
+        return free
+
 
 class EHeap(IExten):
     __slots__ = ('_EHeap__heap', '_EHeap__tag')
@@ -14,6 +14,8 @@ class _HNil(IPred):
 
     def __call__(s, *kl, **kw): return True
 
+    def mask(s, *kl, **kw):     return True
+
 
 class HRange(IPred):
     __slots__ = ('_HRange__rg', '_HRange__ar')
@@ -44,6 +46,9 @@ class HRange(IPred):
     def __call__(s, rel, at, size, delta):
         return s.__rg[0] <= size < s.__rg[1]
 
+    def mask(s, rel, at, size, delta):
+        return s(rel, None, size, delta)
+
 
 class HOneOf(IPred):
     __slots__ = ('_HOneOf__size', '_HOneOf__align')
@@ -74,3 +79,6 @@ class HOneOf(IPred):
 
     def __call__(s, rel, at, size, delta):
         return size in s.__align
+
+    def mask(s, rel, at, size, delta):
+        return s(rel, None, size, delta)
@@ -1,6 +1,9 @@
 #__ LGPL 3.0, 2014 Alexander Soloviev (no.friday@yandex.ru)
 
+from itertools  import islice
+
 from comine.iface.world import IOwner
+from comine.misc.vec    import numpy
 
 class IHeap(IOwner):
     REL_UNKNOWN = 0;    REL_OUTOF   = 1;    REL_ZERO    = 2
@@ -115,6 +118,26 @@ class IHeap(IOwner):
 
         raise Exception('not impl')
 
+    def __page__(s):    # -> int | None
+        ''' Optional page size used by heap impl, None if unknown '''
+
+        return None
+
+    def __state__(s):
+        '''
+            Optional picklable state of discovered heap. When given
+            it is saved to cache and later passed to restore() call
+            instead of doing full discovery for the same core.
+        '''
+
+        return None
+
+    @classmethod
+    def restore(cls, log, infer, state):
+        ''' Constructs heap from __state__() result, None if unable '''
+
+        return None
+
     def emum(s, rg = None, pred = None, huge = None):
         '''
             Yields all known heap chunks as tuples
@@ -138,6 +161,41 @@ class IHeap(IOwner):
 
         raise Exception('not impl')
 
+    def enum_arrays(s, rg = None, pred = None, huge = None, batch = 2**16):
+        '''
+            Batched form of enum() for callers that count or mask
+            chunks, requires numpy. Yields tuples
+
+                tuple := (relation, at, size, gran)
+
+            where at is uint64 array of chunk addresses and size is
+            either a number shared by all chunks of batch or uint64
+            array of the same length. Default impl groups up to batch
+            chunks of enum() having the same relation and gran.
+        '''
+
+        it = s.enum(rg, pred = pred, huge = huge)
+
+        while True:
+            piece = list(islice(it, batch))
+
+            z = 0
+
+            while z < len(piece):
+                key, end = piece[z][0::3], z + 1
+
+                while end < len(piece) and piece[end][0::3] == key:
+                    end += 1
+
+                at, size = zip(*map(lambda x: x[1:3], piece[z:end]))
+
+                yield (key[0], numpy.array(at, dtype = numpy.uint64),
+                        numpy.array(size, dtype = numpy.uint64), key[1])
+
+                z = end
+
+            if len(piece) < batch: break
+
     @classmethod
     def desc(cls, rel, at, offset, size, gran):
         rlit = cls.REL_NAMES.get(rel, '?%u' % rel)
@@ -189,6 +247,16 @@ class IPred(object):
     def __call__(s, rel, at, size, delta):
         raise Exception('not implemented')
 
+    def mask(s, rel, at, size, delta):
+        '''
+            Vector form of __call__() for array of chunk addresses of
+            the same size. Returns bool mask for the array or a single
+            bool if result is not depend on chunk address.
+        '''
+
+        return numpy.fromiter((s(rel, x, size, delta) for x in at),
+                                dtype = bool, count = len(at))
+
     def begin(s, align):
         raise Exception('not implemented')
 
@@ -14,6 +14,14 @@ class ILayout(object):
 
         raise Exception('not implemented')
 
+    def __ident__(s):
+        '''
+            Optional identity of core image, used as a key of data
+            cached between sessions.
+        '''
+
+        return None
+
     def __maps__(s):
         '''
             Optional copy of /proc/${pid}/maps file made just before
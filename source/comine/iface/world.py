@@ -23,12 +23,13 @@ class EPhys(IExten):
 
         raise Exception('Not implemented')
 
-    def search(s, sub, skip = True): # -> at
+    def search(s, sub, rg = None): # -> at
         '''
             Search supplied sub blob string inside physical region
-            and yields addresses of its occurrence. If optional arg
-            skip is set to True search must skip matched substring
-            and go on just after its end.
+            and yields addresses of its occurrence, search skips the
+            matched substring and goes on just after its end. Optional
+            rg limits search to the part of region, nothing is yielded
+            when rg doesn't intersect with the region.
         '''
 
         raise Exception('Not implemented')
@@ -60,3 +61,11 @@ class EPhys(IExten):
         ''' Single data read call '''
 
         raise Exception('Not implemented')
+
+    def view(s, at, size):
+        '''
+            Read only buffer over region [at, at + size). Impls backed
+            by mapped memory should override it to avoid data copying.
+        '''
+
+        return buffer(s.read(at, size))
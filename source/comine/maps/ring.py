@@ -1,6 +1,7 @@
 #__ LGPL 3.0, 2014 Alexander Soloviev (no.friday@yandex.ru)
 
 from bisect import bisect_left, bisect_right
+from array  import array
 
 from comine.maps.tools  import Tools
 from comine.maps.span   import Span
@@ -9,6 +10,7 @@ from comine.maps.trans  import Trans
 from comine.misc.humans import Humans
 from comine.misc.types  import Types
 from comine.misc.segen  import Segen, Scn, ScnRef
+from comine.misc.vec    import U64
 
 _revs = lambda rg, rev: (rg[1] - 1, rg[0] - 1, -1) if rev else rg
 
@@ -17,22 +19,29 @@ class Ring(object):
 
         Alias points are aggregated to regions in the ring or keeped
         out of regions (single points).
+
+        Region bounds are kept in parallel start and end arrays that
+        are used for all lookups. Regions given to the ring in bulk by
+        extend() are kept only in this arrays with reserved seq number
+        and its Span() objects are made on the first access.
     '''
 
     MATCH_EXACT     = 0;    MATCH_NEAR      = 1
 
     __slots__ = ('_Ring__regs', '_Ring__scn', '_Ring__seg',
-                    '_Ring__by_seq', '_Ring__props')
+                    '_Ring__by_seq', '_Ring__props',
+                    '_Ring__starts', '_Ring__ends')
 
     def __init__(s, it = None, props = None):
-        s.__regs    = []
+        s.__regs    = []    # [ Span() | seq ], seq for lazy regions
+        s.__starts  = array(U64)
+        s.__ends    = array(U64)
         s.__scn     = Scn()
         s.__seg     = Segen(start = 1, reuse = True)
         s.__by_seq  = {}
         s.__props   = []    # [ (name, func, args, scn, value) ]
 
-        if it is not None:
-            for rg in it: s.make(rg)
+        if it is not None: s.extend(it)
 
         s.__prop_add('__bytes', Ring.__fn_bytes, mine = True)
 
@@ -44,9 +53,15 @@ class Ring(object):
 
     @classmethod
     def __fn_bytes(cls, ring):
-        return reduce(lambda x, y: x + y, map(len, ring), 0)
+        return sum(ring.__ends) - sum(ring.__starts)
+
+    def __iter__(s):
+        z = 0
+
+        while z < len(s.__regs):
+            yield s.__index(z)
 
-    def __iter__(s):    return iter(s.__regs)
+            z += 1
 
     def __reversed__(s): return s.enum(rev = True)
 
@@ -66,7 +81,7 @@ class Ring(object):
 
     def bound(s, null = False):
         if len(s.__regs) > 0:
-            return (s.__regs[0].__rg__()[0], s.__regs[-1].__rg__()[1])
+            return (s.__starts[0], s.__ends[-1])
         else:
             return None if null is True else (None, None)
 
@@ -91,7 +106,7 @@ class Ring(object):
             raise MapConflict()
 
         else:
-            s.__regs.insert(rg[0], span)
+            s.__insert(rg[0], span.__rg__(), span)
 
             span._Span__bind(s, seq = s.__seg and s.__seg())
 
@@ -104,6 +119,35 @@ class Ring(object):
 
             return span
 
+    def extend(s, it):
+        '''
+            Pushes regions given as (start, end) pairs without making
+            Span() objects for them, they are made lazily on access.
+            Sorted input is appended to the end of arrays.
+        '''
+
+        for rg in it:
+            rg = Tools.check(rg)
+
+            if None in rg:
+                raise Exception('cannot push wilds %s' % Tools.str(rg))
+
+            if len(s.__regs) > 0 and rg[0] >= s.__ends[-1]:
+                at = len(s.__regs)
+
+            else:
+                at, end = s.__locate(rg)
+
+                if at < end: raise MapConflict()
+
+            seq = s.__seg and s.__seg()
+
+            s.__insert(at, rg, seq)
+
+            if seq is not None: s.__by_seq[seq] = rg[0]
+
+            s.__scn.alter()
+
     def pop(s, span):   #   ->  self | None
         '''Remove span from ring, return self on success'''
 
@@ -111,7 +155,7 @@ class Ring(object):
             rg = s.__locate(span.__rg__())
 
             assert rg[0] + 1 == rg[1]
-            assert span == s.__regs[rg[0]]
+            assert span is s.__regs[rg[0]]
 
             if None not in (s.__seg, span.__seq__()):
                 s.__seg.reuse(span.__seq__())
@@ -120,7 +164,7 @@ class Ring(object):
 
             span._Span__bind(None)
 
-            s.__regs.pop(rg[0])
+            s.__remove(rg[0])
             s.__scn.alter()
 
             return s
@@ -136,11 +180,38 @@ class Ring(object):
         for z in xrange(*_revs(rg, rev)):
             if used_scn != int(s.__scn): raise MapOfSync()
 
-            span = s.__regs[z]
+            span = s.__index(z)
 
             if pred(span): yield conv(span)
 
-    def by_seq(s, seq):     return s.__by_seq.get(seq, None)
+    def bounds(s, rg = (None, None)):  # -> (z, start, end)
+        '''
+            Enums bounds of regions intersecting the given range as
+            (z, start, end) without making Span() for lazy regions.
+        '''
+
+        used_scn = s.__scn.__seq__()
+
+        rg = s.__locate(Tools.check(rg or (None, None), True))
+
+        for z in xrange(*rg):
+            if used_scn != int(s.__scn): raise MapOfSync()
+
+            yield (z, s.__starts[z], s.__ends[z])
+
+    def __lazy__(s):
+        ''' Number of regions not yet having a Span() object '''
+
+        return sum(1 for x in s.__regs if not isinstance(x, Span))
+
+    def by_seq(s, seq):
+        span = s.__by_seq.get(seq, None)
+
+        if span is None or isinstance(span, Span):
+            return span
+
+        else:
+            return s.__index(s.__locate((span, span + 1))[0])
 
     def lookup(s, at, exact = True):
         ''' Locate nearest region for the given address '''
@@ -151,15 +222,29 @@ class Ring(object):
             raise Exception('Cannot handle wide spans')
 
         elif rg[0] < rg[1]:
-            return (Ring.MATCH_EXACT, s.__regs[rg[0]])
+            return (Ring.MATCH_EXACT, s.__index(rg[0]))
 
         elif exact is not True and rg[0] < len(s.__regs):
             # TODO: anaylse region egdes types
-            return (Ring.MATCH_NEAR, s.__regs[rg[0]])
+            return (Ring.MATCH_NEAR, s.__index(rg[0]))
 
         else:
             return (None, None)
 
+    def find(s, at, lo = 0):   # -> (z, hit)
+        '''
+            Index z of the last region starting not after the given
+            address, hit is True if the region holds the address. Only
+            bounds arrays are bisected starting from lo index, thus no
+            Span() is made for lazy regions.
+        '''
+
+        z = bisect_right(s.__starts, at, lo) - 1
+
+        return (z, z >= 0 and at < s.__ends[z])
+
+    def span(s, z):     return s.__index(z)
+
     def wider(s, place):
         place = Tools.check(place, True)
 
@@ -168,14 +253,14 @@ class Ring(object):
         if rg[0] == rg[1]:
             pass
 
-        elif place[0] > s.__regs[rg[0]].__rg__()[0]:
+        elif place[0] > s.__starts[rg[0]]:
             return None
 
-        elif place[1] < s.__regs[rg[1] - 1].__rg__()[1]:
+        elif place[1] < s.__ends[rg[1] - 1]:
             return None
 
-        left  = None if rg[0] < 1 else s.__regs[rg[0] - 1].__rg__()[1]
-        right = None if rg[1] >= len(s) else s.__regs[rg[1]].__rg__()[0]
+        left  = None if rg[0] < 1 else s.__ends[rg[0] - 1]
+        right = None if rg[1] >= len(s) else s.__starts[rg[1]]
 
         return (left, right)
 
@@ -194,7 +279,28 @@ class Ring(object):
     def human_bytes(s): return Humans.bytes(s.__bytes__())
 
     def __index(s, at):
-        return s.__regs[at]
+        span = s.__regs[at]
+
+        if not isinstance(span, Span):
+            seq, span = span, Span(rg = (s.__starts[at], s.__ends[at]))
+
+            span._Span__bind(s, seq = seq)
+
+            s.__regs[at] = span
+
+            if seq is not None: s.__by_seq[seq] = span
+
+        return span
+
+    def __insert(s, at, rg, span):
+        s.__regs.insert(at, span)
+        s.__starts.insert(at, rg[0])
+        s.__ends.insert(at, rg[1])
+
+    def __remove(s, at):
+        s.__regs.pop(at)
+        s.__starts.pop(at)
+        s.__ends.pop(at)
 
     def __update(s, span, place):
         assert s == span.__ring__()
@@ -203,10 +309,13 @@ class Ring(object):
             rg = s.__locate(span.__rg__())
 
             assert rg[0] + 1 == rg[1]
-            assert s.__regs[rg[0]] == span
+            assert s.__regs[rg[0]] is span
 
             if Tools.empty(place) is not False:
-                s.__regs.pop(rg[0])
+                s.__remove(rg[0])
+
+            else:
+                s.__starts[rg[0]], s.__ends[rg[0]] = place
 
         s.__scn.alter()
 
@@ -214,11 +323,11 @@ class Ring(object):
 
     def __locate(s, rg):    # -> [x0, x1), intersection index range
         def _calc_l(z):
-            x0 = bisect_right(s.__regs, z) - 1
+            x0 = bisect_right(s.__starts, z) - 1
 
-            return x0 + int(x0 < 0 or z not in s.__regs[x0])
+            return x0 + int(x0 < 0 or z >= s.__ends[x0])
 
-        _calc_r = lambda z: bisect_left(s.__regs, z)
+        _calc_r = lambda z: bisect_left(s.__starts, z)
 
         x0 = 0 if rg[0] is None else _calc_l(rg[0])
 
@@ -0,0 +1,240 @@
+#__ LGPL 3.0, 2026 Alexander Soloviev (no.friday@yandex.ru)
+
+from struct         import Struct
+from bisect         import bisect_left
+from array          import array
+from sys            import byteorder
+from collections    import OrderedDict
+from itertools      import izip
+
+from comine.misc.vec    import numpy, U64
+
+
+class Format(object):
+    '''
+        Compressed format of reverse index. Layout of the file:
+
+            head    magic, version, records per block, records, dir offset
+            blocks  per record varint key delta and zigzag varint delta
+                    of referrer, deltas are reset at each block start
+            dir     (first key, offset) of each block, big endian QQ
+
+        Magic can't be mistaken with raw index: as a key it is far out
+        of any user space address.
+    '''
+
+    MAGIC   = 'CMRIX'
+    VERSION = 1
+
+    HEAD    = Struct('>5sBHQQ')
+    DIR     = Struct('>QQ')
+
+
+class Writer(object):
+    def __init__(s, F, every = 256):
+        s.__file    = F
+        s.__every   = every
+        s.__dir     = []
+        s.__recs    = 0
+        s.__buf     = bytearray()
+        s.__last    = (0, 0)
+
+        F.write(Format.HEAD.pack(Format.MAGIC, Format.VERSION, every, 0, 0))
+
+    def __len__(s): return s.__recs
+
+    def push(s, addr, ref):
+        if s.__recs % s.__every == 0:
+            s.__flush()
+
+            s.__dir.append((addr, s.__file.tell()))
+
+            s.__last = (0, 0)
+
+        Writer.__varint(s.__buf, addr - s.__last[0])
+        Writer.__varint(s.__buf, Writer.__zigzag(ref - s.__last[1]))
+
+        s.__last = (addr, ref)
+
+        s.__recs += 1
+
+    def close(s):
+        s.__flush()
+
+        offset = s.__file.tell()
+
+        for rec in s.__dir: s.__file.write(Format.DIR.pack(*rec))
+
+        s.__file.seek(0)
+        s.__file.write(Format.HEAD.pack(Format.MAGIC, Format.VERSION,
+                                            s.__every, s.__recs, offset))
+
+    def __flush(s):
+        s.__file.write(s.__buf)
+
+        s.__buf = bytearray()
+
+    @staticmethod
+    def __zigzag(val):
+        return (val << 1) if val >= 0 else ((-val << 1) - 1)
+
+    @staticmethod
+    def __varint(buf, val):
+        while val > 0x7f:
+            buf.append(0x80 | (val & 0x7f))
+
+            val >>= 7
+
+        buf.append(val)
+
+
+class Blocks(object):
+    '''
+        Reader of compressed index over mmap() of the file. Directory
+        of blocks is kept in memory, blocks are decoded lazily and a
+        few recently used of them are cached. With numpy varints of
+        a whole block are decoded at once.
+    '''
+
+    def __init__(s, blob, cache = 64):
+        magic, ver, s.__every, s.__len, offset = Format.HEAD.unpack_from(blob)
+
+        if magic != Format.MAGIC or ver != Format.VERSION:
+            raise ValueError('unknown index format %r v%u' % (magic, ver))
+
+        s.__blob    = blob
+        s.__cache   = OrderedDict()
+        s.__limit   = cache
+
+        raw = array(U64, blob[offset:])
+
+        if byteorder == 'little': raw.byteswap()
+
+        s.__keys, s.__offs = raw[0::2], raw[1::2]
+
+        s.__offs.append(offset)
+
+    @classmethod
+    def probe(cls, blob):
+        return blob[:len(Format.MAGIC)] == Format.MAGIC
+
+    def __len__(s): return s.__len
+
+    def key(s, at):
+        return s.__block(at // s.__every)[0][at % s.__every]
+
+    def bound(s, addr, lo, hi):
+        z = bisect_left(s.__keys, addr)
+
+        at = z * s.__every
+
+        if z > 0:
+            keys = s.__block(z - 1)[0]
+
+            at = (z - 1) * s.__every + bisect_left(keys, addr)
+
+        return max(lo, min(hi, at, s.__len))
+
+    def rows(s, a, b):
+        while a < b:
+            z = a // s.__every
+
+            keys, refs = s.__block(z)
+
+            start, end = a - z * s.__every, min(b - z * s.__every, len(keys))
+
+            for rec in izip(keys[start:end], refs[start:end]): yield rec
+
+            a = z * s.__every + end
+
+    def arrays(s, a, b):
+        addrs, refs = array(U64), array(U64)
+
+        while a < b:
+            z = a // s.__every
+
+            keys, vals = s.__block(z)
+
+            start, end = a - z * s.__every, min(b - z * s.__every, len(keys))
+
+            addrs.extend(keys[start:end]); refs.extend(vals[start:end])
+
+            a = z * s.__every + end
+
+        return addrs, refs
+
+    def __block(s, z):
+        some = s.__cache.pop(z, None)
+
+        if some is None:
+            some = s.__decode(z)
+
+            if len(s.__cache) >= s.__limit:
+                s.__cache.popitem(last = False)
+
+        s.__cache[z] = some
+
+        return some
+
+    def __decode(s, z):
+        blob = s.__blob[s.__offs[z]:s.__offs[z + 1]]
+
+        if numpy is not None:
+            return Blocks.__vdecode(blob)
+
+        keys, refs, vals, val, shift = [], [], [], 0, 0
+
+        blob = bytearray(blob)
+
+        for byte in blob:
+            val |= (byte & 0x7f) << shift
+
+            if byte & 0x80:
+                shift += 7
+
+            else:
+                vals.append(val)
+
+                val, shift = 0, 0
+
+        addr, ref = 0, 0
+
+        for z in xrange(0, len(vals), 2):
+            delta = vals[z + 1]
+
+            addr += vals[z]
+            ref += (delta >> 1) if delta & 1 == 0 else -((delta + 1) >> 1)
+
+            keys.append(addr)
+            refs.append(ref)
+
+        return keys, refs
+
+    @staticmethod
+    def __vdecode(blob):
+        '''
+            Every varint ends with a byte without 0x80 bit, thus ends
+            give starts of values and position of each byte in its
+            value. Shifted 7 bit groups are summed up per value, then
+            deltas are unzigzaged and accumulated.
+        '''
+
+        data = numpy.frombuffer(blob, dtype = numpy.uint8)
+
+        ends = numpy.flatnonzero(data < 0x80)
+
+        starts = numpy.concatenate(([0], ends[:-1] + 1))
+
+        pos = numpy.arange(len(data)) - numpy.repeat(starts, ends - starts + 1)
+
+        bits = (data & 0x7f).astype(numpy.uint64) \
+                    << (pos * 7).astype(numpy.uint64)
+
+        vals = numpy.add.reduceat(bits, starts) if len(data) else bits
+
+        delta = vals[1::2]
+
+        refs = (delta >> numpy.uint64(1)).astype(numpy.int64) \
+                    ^ -(delta & numpy.uint64(1)).astype(numpy.int64)
+
+        return numpy.cumsum(vals[0::2]).tolist(), numpy.cumsum(refs).tolist()
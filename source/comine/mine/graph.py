@@ -0,0 +1,262 @@
+#__ LGPL 3.0, 2026 Alexander Soloviev (no.friday@yandex.ru)
+
+from os         import rename, mkdir
+from os.path    import isdir
+from shutil     import rmtree
+from time       import time
+
+from comine.core.logger import log
+from comine.misc.humans import Humans
+from comine.misc.func   import gmap
+from comine.misc.vec    import numpy, need
+from comine.mine.revix  import VEmit
+
+
+class Graph(object):
+    '''
+        Chunk level reference graph stored in cache dir. Heap chunks
+        have dense ids in address order, pointers found inside chunks
+        are resolved to chunk ids and kept as CSR adjacency, i.e.
+
+            fwd_idx[fwd_ptr[z]:fwd_ptr[z + 1]]
+
+        are ids of chunks referred by chunk z, rev_* is the same for
+        referrers. Pointers to chunks from outside of any chunk are
+        kept as (root_ref, root_idx) pairs ordered by chunk id.
+
+        Graph is tagged by identity of core it was built for, graph
+        left from other core is not used.
+    '''
+
+    NAMES = ('start', 'size', 'gran', 'rel', 'fwd_ptr', 'fwd_idx',
+                'rev_ptr', 'rev_idx', 'root_ref', 'root_idx')
+
+    def __init__(s, path):
+        need('chunk graph')
+
+        load = lambda x: numpy.load(path + '/%s.npy' % x, mmap_mode = 'r')
+
+        s.__start, s.__size, s.__gran, s.__rel, s.__fwd_ptr, s.__fwd_idx, \
+            s.__rev_ptr, s.__rev_idx, s.__root_ref, s.__root_idx \
+                = map(load, Graph.NAMES)
+
+        s.__end     = s.__start + s.__size
+
+    @classmethod
+    def locate(cls, infer):
+        layout = infer.__layout__()
+
+        cache = layout and layout.special('cache', False)
+
+        if cache and isdir(cache + '/graph'):
+            if _ident(cache + '/graph') == layout.__ident__():
+                return cls(cache + '/graph')
+
+            log(1, 'graph in %s is stale, do mine graph' % cache)
+
+    def __len__(s):     return len(s.__start)
+
+    def table(s):
+        ''' Returns (start, size, gran, rel) arrays of chunks '''
+
+        return s.__start, s.__size, s.__gran, s.__rel
+
+    def forward(s):     return s.__fwd_ptr, s.__fwd_idx
+
+    def reverse(s):     return s.__rev_ptr, s.__rev_idx
+
+    def roots(s):       return s.__root_ref, s.__root_idx
+
+    def chunk(s, z):    # -> (rel, at, size, gran)
+        return (int(s.__rel[z]), int(s.__start[z]), int(s.__size[z]),
+                    int(s.__gran[z]))
+
+    def find(s, at):
+        ''' Returns id of chunk holding given address or None '''
+
+        at = numpy.array([ at ], dtype = numpy.uint64)
+
+        z = _resolve(s.__start, s.__end, at)[0]
+
+        return None if z < 0 else int(z)
+
+    def rooted(s, terms):
+        ''' Unique ids of chunks referred from given Freg() regions '''
+
+        starts, ends = gmap(lambda x: numpy.array(x, dtype = numpy.uint64),
+                                terms.bounds())
+
+        z = numpy.searchsorted(starts, s.__root_ref, side = 'right')
+
+        ok = z > 0
+
+        ok[ok] = s.__root_ref[ok] < ends[z[ok] - 1]
+
+        return numpy.unique(s.__root_idx[ok])
+
+    def refers(s, z):
+        return s.__fwd_idx[s.__fwd_ptr[z]:s.__fwd_ptr[z + 1]]
+
+    def referrers(s, z):
+        return s.__rev_idx[s.__rev_ptr[z]:s.__rev_ptr[z + 1]]
+
+
+class Builder(object):
+    ''' Builds chunks reference Graph() over all physical memory '''
+
+    def __init__(s, infer):
+        need('chunk graph')
+
+        s.__infer   = infer
+        s.__world   = infer.__world__()
+        s.__heap    = infer.__heman__().get()
+        s.__base    = infer.__layout__().special('cache')
+
+        if s.__heap is None:
+            raise Exception('Heap is not discovered')
+
+    def build(s):
+        start = time()
+
+        table = s.__chunks()
+
+        log(1, 'enumerated %u chunks in %s'
+                    % (len(table[0]), Humans.ago(start)))
+
+        arrays = dict(zip(Graph.NAMES[:4], table))
+
+        arrays.update(s.__edges(table[0], table[0] + table[1]))
+
+        path, temp = s.__base + '/graph', s.__base + '/~graph'
+
+        for some in (temp, path):
+            if isdir(some): rmtree(some)
+
+        mkdir(temp)
+
+        for name in Graph.NAMES:
+            numpy.save(temp + '/%s.npy' % name, arrays[name])
+
+        with open(temp + '/ident', 'w') as F:
+            F.write(s.__infer.__layout__().__ident__())
+
+        rename(temp, path)
+
+        log(1, 'graph of %u chunks with %u links and %u roots in %s'
+                    % (len(table[0]), len(arrays['fwd_idx']),
+                        len(arrays['root_idx']), Humans.ago(start)))
+
+    def __chunks(s):
+        parts = []
+
+        for rel, at, size, gran in s.__heap.enum_arrays():
+            part = numpy.empty((len(at), 4), dtype = numpy.uint64)
+
+            part[:,0], part[:,1], part[:,2], part[:,3] \
+                    = at, size, gran or 0, rel
+
+            parts.append(part)
+
+        if len(parts) > 0:
+            table = numpy.concatenate(parts)
+
+        else:
+            table = numpy.empty((0, 4), dtype = numpy.uint64)
+
+        table = table[numpy.argsort(table[:,0], kind = 'mergesort')]
+
+        return (table[:,0].copy(), table[:,1].copy(),
+                    table[:,2].astype(numpy.uint32),
+                    table[:,3].astype(numpy.uint8))
+
+    def __edges(s, start, end):
+        emit = VEmit(s.__infer, s.__world.addrs(gran = 7),
+                        s.__infer.__order__())
+
+        links, roots = [], []
+
+        for span in s.__spans():
+            for addrs, refs in emit(span.__rg__()):
+                dst = _resolve(start, end, addrs)
+                src = _resolve(start, end, refs)
+
+                inner = (dst >= 0) & (src >= 0) & (src != dst)
+                outer = (dst >= 0) & (src < 0)
+
+                links.append((src[inner], dst[inner]))
+                roots.append((refs[outer], dst[outer]))
+
+        src, dst = _concat(links, numpy.int64)
+        ref, idx = _concat(roots, numpy.uint64)
+
+        order = numpy.argsort(idx, kind = 'mergesort')
+
+        ids = _ids(len(start))
+
+        fwd_ptr, fwd_idx = _csr(src, dst, len(start))
+        rev_ptr, rev_idx = _csr(dst, src, len(start))
+
+        return { 'fwd_ptr' : fwd_ptr, 'fwd_idx' : fwd_idx.astype(ids),
+                    'rev_ptr' : rev_ptr, 'rev_idx' : rev_idx.astype(ids),
+                    'root_ref' : ref[order],
+                    'root_idx' : idx[order].astype(ids) }
+
+    def __spans(s):
+        it = s.__world.physical(None, bins = True)
+
+        spans = set()
+
+        for _, some in it: spans.update(some)
+
+        return sorted(spans)
+
+
+def _ident(path):
+    try:
+        with open(path + '/ident') as F: return F.read()
+
+    except IOError as E:
+        return None
+
+def _ids(count):
+    return numpy.uint32 if count < 2**32 else numpy.uint64
+
+def _concat(pairs, dtype):
+    one = [ numpy.empty(0, dtype = dtype) ] + map(lambda x: x[0], pairs)
+    two = [ numpy.empty(0, dtype = dtype) ] + map(lambda x: x[1], pairs)
+
+    return numpy.concatenate(one).astype(dtype), \
+                numpy.concatenate(two).astype(dtype)
+
+def _resolve(start, end, addrs):
+    ''' Maps addrs to ids of chunks [start, end) holding them or -1 '''
+
+    z = numpy.searchsorted(start, addrs, side = 'right').astype(numpy.int64)
+
+    z -= 1
+
+    ok = z >= 0
+
+    ok[ok] = addrs[ok] < end[z[ok]]
+
+    return numpy.where(ok, z, -1)
+
+def _csr(one, two, count):
+    ''' Unique (one, two) links as (ptr, idx) CSR adjacency of one '''
+
+    order = numpy.lexsort((two, one))
+
+    one, two = one[order], two[order]
+
+    if len(one) > 1:
+        keep = numpy.ones(len(one), dtype = bool)
+
+        keep[1:] = (one[1:] != one[:-1]) | (two[1:] != two[:-1])
+
+        one, two = one[keep], two[keep]
+
+    ptr = numpy.zeros(count + 1, dtype = numpy.int64)
+
+    numpy.cumsum(numpy.bincount(one, minlength = count), out = ptr[1:])
+
+    return ptr, two
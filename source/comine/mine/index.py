@@ -1,12 +1,18 @@
 #__ LGPL 3.0, 2015 Alexander Soloviev (no.friday@yandex.ru)
 
-from os.path    import exists, isfile
+from os.path    import isfile
 from struct     import Struct
 from bisect     import bisect_left
 from math       import log
+from mmap       import mmap, ACCESS_READ
+from itertools  import izip
+from array      import array
+from sys        import byteorder
 
 from comine.maps.tools  import Tools
+from comine.mine.blocks import Blocks
 from comine.misc.func   import yrange
+from comine.misc.vec    import numpy, U64
 from comine.cline.lib   import CFail
 
 
@@ -17,26 +23,41 @@ def Locate(infer, fail = True):
         cache = layout.special('cache', False)
 
         if cache and isfile(cache + '/reverse.index'):
-            return Index(cache + '/reverse.index')
+            fence = cache + '/reverse.fence'
+
+            return Index(cache + '/reverse.index',
+                            fence if isfile(fence) else None)
 
     if fail is True:
         raise CFail('reverse index is not found')
 
 
 class Index(object):
+    '''
+        Reverse index of sorted (addr, ref) records, mmap()'ed to avoid
+        seek() and read() on every bisect probe. Either raw big endian
+        QQ records or compressed blocks, detected by magic of file.
+    '''
+
     _FMT     = Struct('>QQ')
+    _KEY     = Struct('>Q')
 
-    def __init__(s, path):
-        s.__map     = []
+    def __init__(s, path, fence = None):
         s.__file    = open(path, 'rb')
-        s.__usize   = Index._FMT.size
+        s.__map     = None
 
         s.__file.seek(0, 2)
 
-        s.__len     = s.__file.tell() // s.__usize
+        if s.__file.tell() > 0:
+            s.__map = mmap(s.__file.fileno(), 0, access = ACCESS_READ)
+
+        if s.__map is not None and Blocks.probe(s.__map):
+            s.__store = Blocks(s.__map)
 
-        s.__file.seek(0, 0)
+        else:
+            s.__store = _Raw(s.__map, s.__file.tell(), fence)
 
+        s.__len     = len(s.__store)
         s.__depth   = max(8, int(log(s.__len + 1.) / log(2.)))
 
     def __len__(s): return s.__len
@@ -44,33 +65,69 @@ class Index(object):
     def __getitem__(s, at):
         if not (0 <= at < s.__len): raise IndexError()
 
-        s.__file.seek(at * s.__usize)
+        return next(s.__store.rows(at, at + 1))
 
-        raw = s.__file.read(s.__usize)
+    def key(s, at):
+        ''' Returns addr of record at given position '''
 
-        return Index._FMT.unpack(raw)
+        return s.__store.key(at)
+
+    def bound(s, addr, lo = 0, hi = None):
+        ''' Position of first record with key not less than addr '''
+
+        return s.__store.bound(addr, lo, s.__len if hi is None else hi)
 
     def lookup(s, rg):
         rg = Tools.check(rg, True)
 
-        a = bisect_left(s, (rg[0], 0))
+        a = s.bound(rg[0])
 
         if a < s.__len:
-            b = bisect_left(s, (rg[1], 0))
+            b = s.bound(rg[1], a)
+
+            for rec in s.rows(a, b): yield rec
+
+    def rows(s, a, b):
+        ''' Yields records of slice [a, b) '''
+
+        return s.__store.rows(a, b)
+
+    def arrays(s, a, b):    # -> (addrs, refs)
+        '''
+            Records of slice [a, b) as two vectors of addrs and refs,
+            numpy uint64 arrays if numpy is available or U64 arrays.
+        '''
+
+        a, b = max(0, a), min(b, s.__len)
+
+        addrs, refs = s.__store.arrays(a, max(a, b))
+
+        if numpy is not None:
+            return numpy.frombuffer(addrs, dtype = numpy.uint64), \
+                        numpy.frombuffer(refs, dtype = numpy.uint64)
 
-            for x in range(a, b): yield s[x]
+        return addrs, refs
+
+    def lookup_arrays(s, rg):   # -> (addrs, refs)
+        ''' Vector form of lookup(), records of rg as arrays() '''
+
+        rg = Tools.check(rg, True)
+
+        a = s.bound(rg[0])
+
+        return s.arrays(a, s.bound(rg[1], a) if a < s.__len else a)
 
     def enum(s):
         start = 0
 
         while start < s.__len:
-            addr = s[start][0]
+            addr = s.key(start)
 
             for end in yrange(start + 1, min(s.__len, start + s.__depth)):
-                if s[end][0] >= addr + 1: break
+                if s.key(end) >= addr + 1: break
 
             else:
-                end = b = bisect_left(s, (addr + 1, 0))
+                end = s.bound(addr + 1, start + 1)
 
             yield (addr, _Place(s, (start, end)))
 
@@ -94,23 +151,92 @@ class Index(object):
         F.write(cls._FMT.pack(*rec))
 
 
+class _Raw(object):
+    ''' Raw big endian QQ records with optional in memory fence '''
+
+    def __init__(s, blob, size, fence = None):
+        s.__blob    = blob
+        s.__usize   = Index._FMT.size
+        s.__len     = size // s.__usize
+        s.__keys    = _Keys(s)
+
+        s.__every, s.__fence = s.__load_fence(fence)
+
+    def __len__(s): return s.__len
+
+    def key(s, at):
+        return Index._KEY.unpack_from(s.__blob, at * s.__usize)[0]
+
+    def bound(s, addr, lo, hi):
+        if s.__fence is not None:
+            z = bisect_left(s.__fence, addr)
+
+            lo = max(lo, (z - 1) * s.__every + 1) if z > 0 else lo
+            hi = min(hi, z * s.__every)
+
+        return bisect_left(s.__keys, addr, lo, max(lo, hi))
+
+    def rows(s, a, b, batch = 4096):
+        ''' Unpacks records slice [a, b) with one unpack per batch '''
+
+        for at in yrange(a, b, batch):
+            seq = Struct('>%uQ' % (2 * min(batch, b - at)))
+
+            it = iter(seq.unpack_from(s.__blob, at * s.__usize))
+
+            for rec in izip(it, it): yield rec
+
+    def arrays(s, a, b):
+        recs = array(U64, s.__blob[a * s.__usize:b * s.__usize])
+
+        if byteorder == 'little': recs.byteswap()
+
+        return recs[0::2], recs[1::2]
+
+    def __load_fence(s, path):
+        '''
+            Sparse fence table of every Nth key written by revix, it
+            is kept in memory and narrows bisect down to one page.
+        '''
+
+        if path is not None:
+            with open(path, 'rb') as F:
+                every, = Index._KEY.unpack(F.read(Index._KEY.size))
+
+                fence = array(U64, F.read())
+
+            if byteorder == 'little': fence.byteswap()
+
+            if every > 0 and len(fence) == (s.__len + every - 1) // every:
+                return every, fence
+
+        return None, None
+
+
+class _Keys(object):
+    ''' Sequence of index keys, for bisect over the index mmap '''
+
+    def __init__(s, store):
+        s.__store   = store
+
+    def __len__(s):     return len(s.__store)
+
+    def __getitem__(s, at):
+        return s.__store.key(at)
+
+
 class _Place(object):
     def __init__(s, index, rg):
         s.__index   = index
         s.__rg      = rg
-        s.__on      = None
+        s.__it      = None
 
     def __len__(s):     return s.__rg[1] - s.__rg[0]
 
     def __iter__(s):    return s
 
     def next(s):
-        if s.__on is None:
-            s.__on = s.__rg[0]
-
-        elif s.__on >= s.__rg[1]:
-            raise StopIteration()
-
-        s.__on += 1
+        if s.__it is None:
+            s.__it = s.__index.rows(*s.__rg)
 
-        return s.__index[s.__on - 1]
+        return next(s.__it)
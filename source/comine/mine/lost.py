@@ -9,6 +9,7 @@ from comine.core.freg   import Freg
 from comine.exun.stack  import EStack
 from comine.misc.humans import Humans
 from comine.misc.func   import gmap
+from comine.misc.vec    import numpy, need
 
 
 class Walk(object):
@@ -128,6 +129,8 @@ class Lost(object):
                 1. Exclude all heap discovered regions
 
                 2. cut stack edges after sp pointer
+
+                3. skip known zero pages, if zero map is loaded
         '''
 
         stack = list(world.by_prov('stack'))
@@ -149,7 +152,75 @@ class Lost(object):
 
         it = world.physical(None, unused = ([heap[0], stack[0]], _pred))
 
-        return Freg(list(map(lambda x: x[0], it)), model = world.__model__())
+        rgs = world.nonzero(map(lambda x: x[0], it), pad = 7)
+
+        return Freg(list(rgs), model = world.__model__())
+
+
+class Mark(object):
+    '''
+        Lost chunks miner over chunks Graph(). Reachability is marked
+        once by BFS from root refs falling to terminal regions, then
+        chunks are swept by Walk() as with Lost() engine. Marks are
+        kept as bitmap of one bit per chunk, MSB first.
+    '''
+
+    def __init__(s, graph, terms, block = 2**20):
+        need('mark and sweep')
+
+        s.__graph   = graph
+        s.__marks   = numpy.zeros((len(graph) + 7) // 8, dtype = numpy.uint8)
+
+        s.__mark(graph.rooted(terms))
+
+        s.__lost    = set(s.__sweep(graph.table()[0], block))
+
+    def __len__(s):     return len(s.__lost)
+
+    def __marks__(s):   return s.__marks
+
+    def __call__(s, addr):
+        return addr not in s.__lost
+
+    def __sweep(s, start, block):
+        ''' Yields addrs of unmarked chunks, bitmap is unpacked by blocks '''
+
+        for at in xrange(0, len(s.__marks), block):
+            bits = numpy.unpackbits(s.__marks[at:at + block])
+
+            lost = numpy.flatnonzero(bits[:len(start) - at * 8] == 0)
+
+            for addr in start[lost + at * 8].tolist(): yield addr
+
+    def __set(s, ids):
+        bits = (0x80 >> (ids & 0x7)).astype(numpy.uint8)
+
+        numpy.bitwise_or.at(s.__marks, ids >> 3, bits)
+
+    def __test(s, ids):
+        shift = (0x7 - (ids & 0x7)).astype(numpy.uint8)
+
+        return (s.__marks[ids >> 3] >> shift) & 0x1
+
+    def __mark(s, front):
+        ptr, idx = s.__graph.forward()
+
+        front = front.astype(numpy.int64)
+
+        s.__set(front)
+
+        while len(front) > 0:
+            a, b = ptr[front], ptr[front + 1]
+
+            counts = b - a
+
+            base = numpy.repeat(a - (numpy.cumsum(counts) - counts), counts)
+
+            near = idx[base + numpy.arange(counts.sum())].astype(numpy.int64)
+
+            front = numpy.unique(near[s.__test(near) == 0])
+
+            s.__set(front)
 
 
 class _Logger(object):
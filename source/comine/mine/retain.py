@@ -0,0 +1,237 @@
+#__ LGPL 3.0, 2026 Alexander Soloviev (no.friday@yandex.ru)
+
+from array      import array
+
+from comine.misc.vec    import numpy, need
+
+
+class Retain(object):
+    '''
+        Dominator tree of chunks Graph() rooted at virtual root node
+        linked to all chunks referred from terminal regions. Uses the
+        Cooper-Harvey-Kennedy iterative algorithm over flat arrays,
+        retained size of a chunk is the total size of chunks in its
+        dominator subtree. Chunks unreachable from roots are ignored.
+
+        All per chunk state, DFS stack included, is kept in flat arrays
+        of machine words, see cost() for memory estimation. Algorithm
+        itself is run by the interpreter, thus graphs of a few tens of
+        millions chunks are practical for it, see estimate() for time.
+    '''
+
+    RATE    = 4e-6  # seconds per chunk or link spent by interpreter
+
+    def __init__(s, graph, terms, budget = None):
+        need('retained sizes')
+
+        if budget is not None and Retain.cost(graph) > budget:
+            raise Exception('graph of %u chunks needs %ub over budget %ub'
+                                % (len(graph), Retain.cost(graph), budget))
+
+        s.__graph   = graph
+        s.__root    = len(graph)
+        s.__size    = _array(graph.table()[1])
+        s.__kids    = None
+
+        roots = graph.rooted(terms).tolist()
+
+        s.__rooted  = bytearray(s.__root + 1)
+
+        for z in roots: s.__rooted[z] = 1
+
+        s.__order, s.__post = s.__dfs(map(_array, graph.forward()), roots)
+
+        s.__idom    = s.__dominate(map(_array, graph.reverse()))
+
+        s.__retain, s.__count = s.__accumulate()
+
+    @classmethod
+    def cost(cls, graph):
+        '''
+            Estimated peak memory in bytes used by Retain() in addition
+            to the graph: about eleven words and two bytes per chunk and
+            a copy of forward or reverse links while in use.
+        '''
+
+        nodes, edges = len(graph) + 1, len(graph.forward()[1])
+
+        return nodes * (11 * 8 + 2) + edges * 8
+
+    @classmethod
+    def estimate(cls, graph):
+        ''' Rough time in seconds taken by Retain() for the graph '''
+
+        return (len(graph) + len(graph.forward()[1])) * Retain.RATE
+
+    def __len__(s):     return len(s.__order) - 1
+
+    def __root__(s):    return s.__root
+
+    def idom(s, z):
+        ''' Immediate dominator of chunk, root id for top level '''
+
+        return s.__idom[z]
+
+    def retained(s, z):  # -> (bytes, chunks)
+        return s.__retain[z], s.__count[z]
+
+    def top(s, limit = 16):
+        ''' Yields ids of reachable chunks with largest retained size '''
+
+        reach = numpy.array(s.__order[:-1], dtype = numpy.int64)
+
+        if len(reach) > 0:
+            sizes = numpy.frombuffer(s.__retain, dtype = numpy.uint64)[reach]
+
+            cut = max(0, len(reach) - limit)
+
+            some = numpy.argpartition(sizes, cut)[cut:]
+
+            some = some[numpy.argsort(sizes[some], kind = 'mergesort')[::-1]]
+
+            for z in reach[some].tolist(): yield z
+
+    def breakdown(s, z):
+        ''' Returns { size : count } of chunks dominated by z '''
+
+        if s.__kids is None:
+            s.__kids = s.__tree()
+
+        ptr, kids = s.__kids
+
+        stats, stack = {}, [ z ]
+
+        while stack:
+            v = stack.pop()
+
+            stats[s.__size[v]] = stats.get(s.__size[v], 0) + 1
+
+            stack.extend(kids[ptr[v]:ptr[v + 1]].tolist())
+
+        return stats
+
+    def __dfs(s, fwd, roots):
+        ptr, idx = fwd
+
+        post = array('l', [ -1 ]) * (s.__root + 1)
+        seen = bytearray(s.__root + 1)
+        order = array('l')
+
+        # each node is pushed once, stack of (node, next link) pairs
+        nodes = array('l', [ 0 ]) * (s.__root + 1)
+        links = array('l', [ 0 ]) * (s.__root + 1)
+
+        nodes[0], depth, seen[s.__root] = s.__root, 1, 1
+
+        while depth > 0:
+            v, k = nodes[depth - 1], links[depth - 1]
+
+            if v == s.__root:
+                at, end = k, len(roots)
+
+            else:
+                at, end = ptr[v] + k, ptr[v + 1]
+
+            if at >= end:
+                depth -= 1
+
+                post[v] = len(order)
+
+                order.append(v)
+
+            else:
+                links[depth - 1] += 1
+
+                to = roots[at] if v == s.__root else idx[at]
+
+                if not seen[to]:
+                    seen[to] = 1
+
+                    nodes[depth], links[depth] = to, 0
+
+                    depth += 1
+
+        return order, post
+
+    def __dominate(s, rev):
+        ptr, idx = rev
+
+        idom, post = array('l', [ -1 ]) * (s.__root + 1), s.__post
+
+        idom[s.__root] = s.__root
+
+        def _isect(one, two):
+            while one != two:
+                while post[one] < post[two]: one = idom[one]
+
+                while post[two] < post[one]: two = idom[two]
+
+            return one
+
+        changed = True
+
+        while changed:
+            changed = False
+
+            for z in xrange(len(s.__order) - 2, -1, -1):
+                v, new = s.__order[z], -1
+
+                if s.__rooted[v]: new = s.__root
+
+                for p in idx[ptr[v]:ptr[v + 1]]:
+                    if idom[p] < 0:
+                        pass
+
+                    elif new < 0:
+                        new = p
+
+                    else:
+                        new = _isect(p, new)
+
+                if idom[v] != new:
+                    idom[v], changed = new, True
+
+        return idom
+
+    def __accumulate(s):
+        retain = array('L', [ 0 ]) * (s.__root + 1)
+        count = array('L', [ 0 ]) * (s.__root + 1)
+
+        for v in s.__order:
+            retain[v] += 0 if v == s.__root else s.__size[v]
+            count[v] += 1
+
+            if v != s.__root:
+                retain[s.__idom[v]] += retain[v]
+                count[s.__idom[v]] += count[v]
+
+        return retain, count
+
+    def __tree(s):
+        idom = numpy.frombuffer(s.__idom, dtype = numpy.int64)[:s.__root]
+
+        reach = numpy.flatnonzero(idom >= 0)
+
+        parent = idom[reach]
+
+        order = numpy.argsort(parent, kind = 'mergesort')
+
+        ptr = numpy.zeros(s.__root + 2, dtype = numpy.int64)
+
+        counts = numpy.bincount(parent, minlength = s.__root + 1)
+
+        numpy.cumsum(counts, out = ptr[1:])
+
+        return ptr, reach[order]
+
+
+def _array(vec):
+    ''' Copies numpy vector to compact array for fast item access '''
+
+    code = { 1 : 'B', 4 : 'I', 8 : 'l' if vec.dtype.kind == 'i' else 'L' }
+
+    out = array(code[vec.dtype.itemsize])
+
+    out.fromstring(numpy.ascontiguousarray(vec).tostring())
+
+    return out
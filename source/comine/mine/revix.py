@@ -2,71 +2,135 @@
 
 from itertools      import islice, count, chain
 from os             import rename, unlink
-from os.path        import isdir
-from shutil         import move
+from os.path        import isdir, isfile
 from struct         import pack, Struct
 from time           import time
 from glob           import glob
 from heapq          import heappush, heappop
+from multiprocessing import Pool
 
+from comine.arch.elf    import Image, Reader
+from comine.core.freg   import Freg
 from comine.core.logger import log
+from comine.mine.blocks import Writer
+from comine.mine.zero   import Zeroes
+from comine.maps.span   import Span
 from comine.misc.humans import Humans
 from comine.misc.func   import gmap, yrange
-from comine.misc.perf   import Perf
+from comine.misc.vec    import numpy, need
+
+_REC = Struct('>QQ')    # (addr, ref) record of runs and raw index
 
 
 class Revix(object):
-    def __init__(s, infer, packs = 20000000):
+    def __init__(s, infer, mem = 1024, vector = False, jobs = 1,
+                    packed = False):
         s.__infer   = infer
         s.__world   = infer.__world__()
         s.__base    = infer.__layout__().special('temp')
-        s.__packs   = int(packs)
+        s.__packs   = max(1, (int(mem) << 20) // _cost())
+        s.__jobs    = max(1, int(jobs))
+        s.__vector  = vector
+        s.__packed  = packed
 
         if not isdir(s.__base):
             raise Exception("path='%s' isn't a dir" % s.__base)
 
-        s.__emit = Emit(infer, s.__world.addrs(gran = 7).make())
+        s.__freg = s.__world.addrs(gran = 7)
+
+        Zeroes(infer).load(build = False)
+
+        if vector:
+            s.__emit = VEmit(infer, s.__freg, infer.__order__())
+
+        else:
+            s.__emit = Emit(infer, s.__freg.make(), infer.__order__())
 
     def build(s):
         parts = list(s.__collect())
 
         base = s.__infer.__layout__().special('cache')
 
-        im = base + '/~reverse.index'
+        im, fe = base + '/~reverse.index', base + '/~reverse.fence'
+
+        if s.__packed is True:
+            _Merge(parts).do(im, packed = True)
+
+            if isfile(base + '/reverse.fence'):
+                unlink(base + '/reverse.fence')
 
-        _Merge(parts).do(im)
+        else:
+            _Merge(parts).do(im, fe)
+
+            rename(fe, base + '/reverse.fence')
 
         rename(im, base + '/reverse.index')
 
         for path in parts: unlink(path)
 
     def __collect(s):
-        it = gmap(lambda x: pack('>QQ', *x), s.__walk())
+        spans, image = s.__spans(), s.__infer.__core__().__image__()
 
-        for seq in count():
-            piece = list(islice(it, s.__packs))
+        if s.__jobs > 1 and image is not None:
+            pred = lambda x: image.covers(x.__rg__())
 
-            if len(piece) < 1:
-                break
+            for path in s.__shard(image, filter(pred, spans)):
+                yield path
 
-            else:
-                piece.sort()
+            spans = filter(lambda x: not pred(x), spans)
 
-                path = s.__base + '/_pack_%04x' % seq
+        path = s.__base + '/_pack_%04x'
 
-                with open(path, 'wb', 2 ** 18) as F:
-                    for blob in piece: F.write(blob)
+        it = _runs(s.__walk(spans), path, s.__packs, s.__vector)
 
-                piece = None
+        for path in it: yield path
 
-                yield path
+    def __shard(s, image, spans):
+        '''
+            Scans spans backed by core image in a pool of processes,
+            each worker reads core file directly and writes its own
+            sorted runs. Spans are cut to pieces of shard bytes with
+            7 bytes overlap to not lose pointers crossing a cut.
+        '''
+
+        tasks = list(s.__tasks(image, spans))
+
+        log(1, 'sharding %u spans in %u tasks over %u jobs'
+                    % (len(spans), len(tasks), s.__jobs))
 
-    def __walk(s, block = 2**18):
-        for span in s.__spans():
+        pool, start, found, total = Pool(s.__jobs), time(), 0, 0
+
+        try:
+            it = pool.imap_unordered(_shard, tasks)
+
+            for left, (runs, some, size) in enumerate(it, 1):
+                found, total = found + some, total + size
+
+                log(4, 'indexed %u in %s for %s, %u tasks left'
+                        % (found, Humans.bytes(total), Humans.ago(start),
+                            len(tasks) - left))
+
+                for path in runs: yield path
+
+        finally:
+            pool.terminate()
+
+    def __tasks(s, image, spans, shard = 2**30):
+        regs, model = list(s.__freg.enum()), s.__world.__model__()
+
+        packs = max(1, s.__packs // s.__jobs)
+
+        for seq, rgs in enumerate(_pieces(spans, shard)):
+            path = s.__base + '/_pack_%04x_%%04x' % seq
+
+            yield (image.__path__(), regs, model, s.__vector, path, packs, rgs)
+
+    def __walk(s, spans, block = 2**18):
+        for span in spans:
             found, start = 0, time()
 
             for some in s.__emit(span.__rg__(), block):
-                found += 1
+                found += len(some[0]) if s.__vector else 1
 
                 yield some
 
@@ -74,16 +138,159 @@ class Revix(object):
                         % (found, Humans.ago(start), span))
 
     def __spans(s):
+        ''' Physical spans to scan with known zero pages cut out '''
+
         it = s.__world.physical(None, bins = True)
 
-        return sorted(list(set(chain(*gmap(lambda x: x[1], it)))))
+        spans = sorted(list(set(chain(*gmap(lambda x: x[1], it)))))
+
+        rgs = s.__world.nonzero(map(lambda x: x.__rg__(), spans), pad = 7)
+
+        return map(lambda x: Span(rg = x), rgs)
+
+
+def _pieces(spans, shard):
+    ''' Groups spans cut with 7 bytes overlap to lists of ~shard bytes '''
+
+    piece, left = [], shard
+
+    for span in spans:
+        rg = span.__rg__()
+
+        for at in yrange(rg[0], rg[1], shard):
+            end = min(at + shard + 7, rg[1])
+
+            piece.append((at, end))
+
+            left -= end - at
+
+            if left <= 0:
+                yield piece
+
+                piece, left = [], shard
+
+    if len(piece) > 0:
+        yield piece
+
+def _cost():
+    ''' Approximate memory cost of one record in a run being sorted '''
+
+    return 96 if numpy is None else 40
+
+def _runs(it, path, packs, batched = False):
+    '''
+        Writes sorted runs of (addr, ref) to path % seq files, either
+        from pairs or from batches of numpy arrays given by VEmit().
+    '''
+
+    if numpy is not None:
+        return _vruns(it if batched else _batches(it), path, packs)
+
+    elif batched is True:
+        raise Exception('batched runs require numpy')
+
+    else:
+        return _lruns(it, path, packs)
+
+def _batches(it, size = 2**16):
+    while True:
+        piece = numpy.array(list(islice(it, size)), dtype = numpy.uint64)
+
+        if len(piece) < 1: break
+
+        yield piece[:,0], piece[:,1]
+
+def _vruns(it, path, packs):
+    '''
+        Accumulates records in preallocated arrays of packs size, each
+        full run is sorted with lexsort() and written at once.
+    '''
+
+    addrs = numpy.empty(packs, dtype = numpy.uint64)
+    refs = numpy.empty(packs, dtype = numpy.uint64)
+
+    seq, fill = 0, 0
+
+    for one, two in it:
+        while len(one) > 0:
+            take = min(len(one), packs - fill)
+
+            addrs[fill:fill + take] = one[:take]
+            refs[fill:fill + take] = two[:take]
+
+            fill, one, two = fill + take, one[take:], two[take:]
+
+            if fill == packs:
+                yield _flush(addrs, refs, fill, path % seq)
+
+                seq, fill = seq + 1, 0
+
+    if fill > 0:
+        yield _flush(addrs, refs, fill, path % seq)
+
+def _flush(addrs, refs, fill, path):
+    addrs, refs = addrs[:fill], refs[:fill]
+
+    order = numpy.lexsort((refs, addrs))
+
+    out = numpy.empty((fill, 2), dtype = '>u8')
+
+    out[:,0], out[:,1] = addrs[order], refs[order]
+
+    out.tofile(path)
+
+    return path
+
+def _lruns(it, path, packs):
+    it = gmap(lambda x: pack('>QQ', *x), it)
+
+    for seq in count():
+        piece = list(islice(it, packs))
+
+        if len(piece) < 1:
+            break
+
+        else:
+            piece.sort()
+
+            with open(path % seq, 'wb', 2 ** 18) as F:
+                for blob in piece: F.write(blob)
+
+            piece = None
+
+            yield path % seq
+
+def _shard(task):
+    ''' Pool worker of Revix, scans regions of core image to runs '''
+
+    core, regs, model, vector, path, packs, rgs = task
+
+    direct, freg, found = Reader(Image(core)), Freg(regs, model), [ 0 ]
+
+    if vector:
+        emit = VEmit(direct, freg, direct.__order__())
+
+    else:
+        emit = Emit(direct, freg.make(), direct.__order__())
+
+    def _count(it):
+        for some in it:
+            found[0] += len(some[0]) if vector else 1
+
+            yield some
+
+    it = _count(chain(*gmap(emit, rgs)))
+
+    runs = list(_runs(it, path, packs, vector))
+
+    return runs, found[0], sum(gmap(lambda rg: rg[1] - rg[0], rgs))
 
 
 class Emit(object):
-    def __init__(s, infer, pred):
+    def __init__(s, infer, pred, order = '<'):
         s.__infer   = infer
         s.__pred    = pred
-        s.__atom    = Struct('<Q')
+        s.__atom    = Struct(order + 'Q')
         s.__step    = s.__atom.size - 1
 
     def __call__(s, rg, block = 2**18):
@@ -99,6 +306,63 @@ class Emit(object):
                     yield (addr, caret + off)
 
 
+class VEmit(object):
+    '''
+        Vectorized Emit(), numpy based. Each block is viewed as uint64
+        words at all 8 byte phases and every phase is tested against
+        regions table with a single searchsorted() call. Yields found
+        pointers in batches of (addrs, refs) uint64 arrays. Words are
+        read in target byte order given by struct prefix.
+    '''
+
+    def __init__(s, infer, freg, order = '<'):
+        need('vectorized scan')
+
+        start, end = freg.bounds()
+
+        s.__infer   = infer
+        s.__word    = numpy.dtype(order + 'u8')
+        s.__start   = numpy.array(start, dtype = numpy.uint64)
+        s.__end     = numpy.array([0] + end, dtype = numpy.uint64)
+
+    def __call__(s, rg, block = 2**18):
+        for caret in yrange(*(rg + (block - 7,))):
+            size = min(block, rg[1] - caret)
+
+            piece = s.__infer.readvar(caret, size, False)
+
+            addrs, refs = s.__scan(piece, caret, size)
+
+            if len(addrs) > 0:
+                yield addrs, refs
+
+    def pairs(s, rg, block = 2**18):
+        ''' Compatible with Emit() interface, yields (addr, ref) '''
+
+        for addrs, refs in s(rg, block):
+            for some in zip(addrs.tolist(), refs.tolist()):
+                yield some
+
+    def __scan(s, piece, caret, size):
+        addrs, refs = [], []
+
+        for phase in xrange(min(8, size - 7)):
+            words = numpy.frombuffer(piece, dtype = s.__word,
+                            count = (size - phase) // 8, offset = phase)
+
+            z = numpy.searchsorted(s.__start, words, side = 'right')
+
+            hit = numpy.flatnonzero((words < s.__end[z]) & (words != 0))
+
+            addrs.append(words[hit].astype(numpy.uint64, copy = False))
+            refs.append(hit.astype(numpy.uint64) * 8 + (caret + phase))
+
+        if len(addrs) < 1:
+            return (), ()
+
+        return numpy.concatenate(addrs), numpy.concatenate(refs)
+
+
 class _Merge(object):
     def __init__(s, parts):
         s.__heap    = []
@@ -109,9 +373,33 @@ class _Merge(object):
             if head.next():
                 heappush(s.__heap, head)
 
-    def do(s, final):
+    def do(s, final, fence = None, every = 256, packed = False):
+        '''
+            Writes merged index to final either as compressed blocks
+            of every records or raw with fence file of every Nth key,
+            prefixed with N. Default N gives one fence key per 4KiB
+            page of raw index.
+        '''
+
         with open(final, 'wb', 2**18) as F:
-            for one in s.__take(): F.write(one)
+            if packed is True:
+                wr, unpack = Writer(F, every), _REC.unpack
+
+                for one in s.__take(): wr.push(*unpack(one))
+
+                wr.close()
+
+            elif fence is None:
+                for one in s.__take(): F.write(one)
+
+            else:
+                with open(fence, 'wb', 2**16) as G:
+                    G.write(pack('>Q', every))
+
+                    for z, one in enumerate(s.__take()):
+                        if z % every == 0: G.write(one[:8])
+
+                        F.write(one)
 
     def __take(s):
         while len(s.__heap) > 0:
@@ -124,7 +412,6 @@ class _Merge(object):
 
 
 class _Thread(object):
-    __PAT = Struct('>QQ')
 
     def __init__(s, path):
         s.__f       = open(path, 'rb')
@@ -153,16 +440,16 @@ class _Thread(object):
 
         s.__blo = []
 
-        piece = s.__f.read(items * s.__class__.__PAT.size)
+        piece = s.__f.read(items * _REC.size)
 
         if len(piece) == 0:
             s.__f = None
 
-        elif len(piece) % s.__class__.__PAT.size != 0:
+        elif len(piece) % _REC.size != 0:
             raise Exception('Invalid blob size=%u got' % len(piece))
 
         else:
-            for z in xrange(0, len(piece), s.__class__.__PAT.size):
-                s.__blo.append(piece[z: z + s.__class__.__PAT.size])
+            for z in xrange(0, len(piece), _REC.size):
+                s.__blo.append(piece[z: z + _REC.size])
 
             s.__off = 0
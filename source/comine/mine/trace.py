@@ -19,7 +19,8 @@ class Clect(object):
         if s.__heap is None:
             raise Exception('Heap is not discovered')
 
-        s.__emit    = Emit(infer, world.addrs(gran = 7).make())
+        s.__emit    = Emit(infer, world.addrs(gran = 7).make(),
+                            infer.__order__())
 
     def __call__(s, at, mask = 0x0):
         rel, at, _, size, _  = s.__heap.lookup(at)
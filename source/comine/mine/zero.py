@@ -1,8 +1,11 @@
 #__ LGPL 3.0, 2015 Alexander Soloviev (no.friday@yandex.ru)
 
 from os             import rename
-from os.path        import isdir, exists
+from os.path        import exists
 from itertools      import chain
+from array          import array
+from bisect         import bisect_right
+from struct         import Struct
 from re             import match
 
 from comine.iface.world import IOwner
@@ -10,64 +13,98 @@ from comine.core.logger import log
 from comine.maps.ring   import Ring
 from comine.misc.humans import Humans
 from comine.misc.func   import gmap, yrange
-from comine.misc.perf   import Perf
+from comine.misc.vec    import numpy, U64
 
 
 class Zeroes(IOwner):
     def __init__(s, infer):
         s.__world   = infer.__world__()
         s.__lay     = infer.__layout__()
-        s.__emit    = Zero(infer)
+        s.__infer   = infer
+        s.__zmap    = None
 
         s.__ring = (s.__world.by_prov('zero') or [None])[0]
 
-    def load(s):
-        if s.__ring is None:
+    def __zmap__(s):    return s.__zmap
+
+    def load(s, build = True):
+        '''
+            Registers zero ranges ring in world, builds map of zero
+            ranges if it is not cached yet and build is True. Text
+            zero.ring of older caches is converted to the map once.
+        '''
+
+        if s.__ring is None and s.__lay is not None:
             base = s.__lay.special('cache')
 
-            target = base + '/zero.ring'
+            target = base + '/zero.map'
+
+            if not exists(target) and exists(base + '/zero.ring'):
+                s.__convert(base + '/zero.ring', base + '/~zero.map', target)
 
             if not exists(target):
-                s.__build(base + '/~zero.ring', target)
+                if build is not True: return
 
-            s.__ring = Ring()
+                s.__build(base + '/~zero.map', target)
 
-            def _parse(line):
-                g = match('([\da-f]+) ([\da-f]+)', line.strip())
+            s.__zmap = ZMap.load(target)
 
-                if g is not None:
-                    return tuple(map(lambda x: int(x, 16), g.groups()))
-
-            with open(target, 'r') as F:
-                for place in gmap(_parse, F):
-                    s.__ring.make(rg = place)
+            s.__ring = Ring(it = s.__zmap.enum())
 
             s.__world.push(s, s.__ring, provide = 'zero')
 
     def __build(s, temp, target):
-        with open(temp, 'w') as ou:
-            count, total, zero = s.__walk(ou.write)
+        emit = Zero(s.__infer, page = s.__page(s.__infer))
+
+        pairs, total = s.__walk(emit)
+
+        zmap = ZMap.make(pairs)
+
+        zmap.save(temp)
+
+        rename(temp, target)
+
+        print '-found %u zero rg in %s over %s, %s sparse in core' \
+                    % (len(zmap),
+                        Humans.bytes(zmap.__bytes__()),
+                        Humans.bytes(total),
+                        Humans.bytes(emit.__sparse__()))
+
+    @classmethod
+    def __convert(cls, source, temp, target):
+        pairs = array(U64)
+
+        with open(source, 'r') as F:
+            for line in F:
+                g = match('([\da-f]+) ([\da-f]+)', line.strip())
+
+                if g is not None:
+                    pairs.extend(map(lambda x: int(x, 16), g.groups()))
+
+        ZMap.make(pairs).save(temp)
 
         rename(temp, target)
 
-        print '-found %u zero rg in %s over %s' \
-                    % (count,
-                        Humans.bytes(zero),
-                        Humans.bytes(total))
+        log(1, 'converted %u zero rg of %s to %s'
+                    % (len(pairs) // 2, source, target))
 
-    def __walk(s, save):
-        count, total, zero = 0, 0, 0
+    def __walk(s, emit):
+        pairs, total = array(U64), 0
 
         for span in s.__spans():
             total += len(span)
 
-            for place in s.__emit(span):
-                save('%016x %016x\n' % place)
+            for place in emit(span): pairs.extend(place)
+
+        return pairs, total
 
-                zero += place[1] - place[0]
-                count += 1
+    @classmethod
+    def __page(cls, infer):
+        ''' Page size of discovered heaps or default 4KiB '''
 
-        return count, total, zero
+        pages = map(lambda x: x.__page__(), infer.__heman__().enum())
+
+        return min(filter(None, pages) or [ 4096 ])
 
     def __spans(s):
         it = s.__world.physical(None, bins = True)
@@ -75,40 +112,225 @@ class Zeroes(IOwner):
         return sorted(list(set(chain(*gmap(lambda x: x[1], it)))))
 
 
+class ZMap(object):
+    '''
+        Binary map of zero ranges. Keeps sorted and merged (start, end)
+        pairs in flat arrays and a bitmap of 1GiB windows holding any
+        zero range for a fast reject. Stored as header, pairs and the
+        bitmap, all in native byte order.
+    '''
+
+    __HEAD  = Struct('8sQQ')
+    __MAGIC = 'CMZRO\x00\x00\x01'
+    __WIN   = 30
+
+    def __init__(s, pairs, bits = None):
+        s.__starts  = pairs[0::2]
+        s.__ends    = pairs[1::2]
+        s.__bits    = bits if bits is not None else s.__windows()
+
+    def __len__(s):     return len(s.__starts)
+
+    def __bytes__(s):
+        return sum(s.__ends) - sum(s.__starts)
+
+    def enum(s):    # -> (start, end)
+        return zip(s.__starts, s.__ends)
+
+    def subtract(s, rg, pad = 0):
+        '''
+            Yields parts of region rg not covered by zero ranges. Each
+            zero range is shrunk by pad bytes on both sides, thus data
+            crossing edges of zero range up to pad bytes are kept.
+        '''
+
+        at, end = rg
+
+        if s.__touch(rg):
+            z = bisect_right(s.__ends, at)
+
+            while z < len(s.__starts) and s.__starts[z] < end:
+                a, b = s.__starts[z] + pad, s.__ends[z] - pad
+
+                if a < b and b > at:
+                    if a > at: yield (at, min(a, end))
+
+                    at = b
+
+                z += 1
+
+        if at < end: yield (at, end)
+
+    def __touch(s, rg):
+        ''' True if any window of rg may hold a zero range '''
+
+        a, b = rg[0] >> ZMap.__WIN, (rg[1] - 1) >> ZMap.__WIN
+
+        for w in xrange(a, min(b + 1, len(s.__bits) * 8)):
+            if s.__bits[w >> 3] & (1 << (w & 0x7)): return True
+
+        return False
+
+    def __windows(s):
+        bits = bytearray(((s.__ends[-1] >> ZMap.__WIN) >> 3) + 1 if s else 0)
+
+        for a, b in s.enum():
+            for w in xrange(a >> ZMap.__WIN, ((b - 1) >> ZMap.__WIN) + 1):
+                bits[w >> 3] |= 1 << (w & 0x7)
+
+        return bits
+
+    @classmethod
+    def make(cls, pairs):
+        ''' Sorts and merges adjacent or overlapped (start, end) pairs '''
+
+        merged = array(U64)
+
+        for a, b in sorted(zip(pairs[0::2], pairs[1::2])):
+            if len(merged) > 0 and a <= merged[-1]:
+                merged[-1] = max(merged[-1], b)
+
+            elif a < b:
+                merged.extend((a, b))
+
+        return cls(merged)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'rb') as F:
+            magic, count, size = cls.__HEAD.unpack(F.read(cls.__HEAD.size))
+
+            if magic != cls.__MAGIC:
+                raise Exception('invalid zero map %s' % path)
+
+            pairs = array(U64)
+
+            pairs.fromfile(F, 2 * count)
+
+            return cls(pairs, bytearray(F.read(size)))
+
+    def save(s, path):
+        pairs = array(U64, chain(*s.enum()))
+
+        with open(path, 'wb') as F:
+            F.write(ZMap.__HEAD.pack(ZMap.__MAGIC, len(s), len(s.__bits)))
+
+            pairs.tofile(F)
+
+            F.write(s.__bits)
+
+
 class Zero(object):
-    def __init__(s, infer, page = 4096):
+    '''
+        Emits zero page ranges of span. Memory is read in large blocks
+        and all pages of block are classified at once, numpy gives one
+        vectorized comparison per block, plain compare of each page is
+        the fallback. Adjacent zero pages are merged into ranges.
+
+        Spans backed by core image are split to file extents first,
+        holes of sparse core are zero without reading, only data
+        extents are scanned.
+    '''
+
+    def __init__(s, infer, page = 4096, block = 2**22):
         s.__infer   = infer
         s.__mask    = page - 1
+        s.__block   = max(page, block & ~s.__mask)
+        s.__zpage   = '\0' * page
+        s.__sparse  = 0
 
         assert s.__mask & page == 0x0
 
+    def __sparse__(s):  return s.__sparse
+
     def __call__(s, span):
-        caret = None
+        last = None
 
-        for at, used in s.__enum(rg = span.__rg__()):
-            if not used:
-                caret = at if caret is None else caret
+        for place in s.__enum(rg = span.__rg__()):
+            if last is None:
+                last = place
 
-            elif caret is not None:
-                yield (caret, at)
+            elif last[1] >= place[0]:
+                last = (last[0], max(last[1], place[1]))
 
-                caret = None
+            else:
+                yield last
+
+                last = place
+
+        if last is not None: yield last
 
     def __enum(s, rg):
         rg = ((rg[0] + s.__mask) & ~s.__mask, rg[1] & ~s.__mask)
 
-        if rg[0] < rg[1]:
-            for at in yrange(*(rg + (s.__mask + 1,))):
-                size = min(s.__mask + 1, rg[1] - at)
+        if rg[0] >= rg[1]: return
 
-                blob = s.__infer.readvar(at, size, False)
+        for (a, b), data in s.__extents(rg):
+            if data:
+                a, b = max(rg[0], a & ~s.__mask), \
+                            min(rg[1], (b + s.__mask) & ~s.__mask)
 
-                yield at, s.__check(blob)
+                for place in s.__scan((a, b)): yield place
 
-            yield rg[1], True
+            else:
+                s.__sparse += b - a
 
-    def __check(s, blob):
-        for z in (blob or '\xff'):
-            if z != '\0': return True
+                a, b = (a + s.__mask) & ~s.__mask, b & ~s.__mask
 
-        return False
+                if a < b: yield (a, b)
+
+    def __extents(s, rg):
+        core = s.__infer.__core__()
+
+        image = core and core.__image__()
+
+        if image is not None and image.covers(rg):
+            return image.extents(rg)
+
+        return [ (rg, True) ]
+
+    def __scan(s, rg):
+        for at in yrange(rg[0], rg[1], s.__block):
+            size = min(s.__block, rg[1] - at)
+
+            blob = s.__infer.readvar(at, size, False)
+
+            if blob is None:
+                continue
+
+            elif numpy is not None:
+                runs = s.__vruns(blob, size)
+
+            else:
+                runs = s.__runs(blob, size)
+
+            for a, b in runs: yield (at + a, at + b)
+
+    def __vruns(s, blob, size):
+        ''' Zero runs of block as offsets, vectorized over pages '''
+
+        page = s.__mask + 1
+
+        words = numpy.frombuffer(blob, dtype = numpy.uint64, count = size // 8)
+
+        zero = ~words.reshape(-1, page // 8).any(axis = 1)
+
+        edge = numpy.diff(numpy.concatenate(([0], zero.view(numpy.int8), [0])))
+
+        starts, ends = numpy.flatnonzero(edge > 0), numpy.flatnonzero(edge < 0)
+
+        return zip((starts * page).tolist(), (ends * page).tolist())
+
+    def __runs(s, blob, size):
+        page, caret, blob = s.__mask + 1, None, buffer(blob)
+
+        for off in xrange(0, size, page):
+            if blob[off:off + page] == s.__zpage:
+                caret = off if caret is None else caret
+
+            elif caret is not None:
+                yield (caret, off)
+
+                caret = None
+
+        if caret is not None: yield (caret, size)
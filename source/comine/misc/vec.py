@@ -0,0 +1,34 @@
+#__ LGPL 3.0, 2026 Alexander Soloviev (no.friday@yandex.ru)
+
+'''
+    Vector helpers. gdb python runtime may be built without numpy
+    package, thus each vectorized code path must check it and fall
+    back or refuse to work when numpy is None.
+'''
+
+from array  import array
+
+try:
+    import numpy
+
+except ImportError as E:
+    numpy = None
+
+
+def need(what):
+    if numpy is None:
+        raise Exception('numpy is required for %s' % what)
+
+    return numpy
+
+def _u64():
+    ''' py2 array has no Q typecode, L is 64 bit on LP64 targets '''
+
+    for code in ('L', 'Q'):
+        try:
+            if array(code).itemsize == 8: return code
+
+        except ValueError as E:
+            pass
+
+U64 = _u64()
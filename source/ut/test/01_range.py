@@ -12,6 +12,7 @@ from comine.maps.tools  import Tools
 from comine.maps.span   import Span
 from comine.maps.alias  import Alias
 from comine.maps.ring   import Ring
+from comine.maps.errors import MapConflict
 from comine.maps.dump   import dump
 from comine.maps.walk   import Walk
 
@@ -154,8 +155,42 @@ def test_map_place():
         print 'CT', span
 
 
+def test_map_extend():
+    ring = Ring(it = [ (0x000, 0x100), (0x400, 0x500) ])
+
+    ring.extend([ (0x200, 0x300) ])
+
+    assert len(ring) == 3 and ring.__bytes__() == 0x300
+
+    span = ring.by_seq(3)
+
+    assert span.__rg__() == (0x200, 0x300) and ring.by_seq(3) is span
+
+    assert ring.lookup(0x450)[1] is ring.by_seq(2)
+
+    span.extend(where = 1, to = 0x380)
+
+    assert ring.wider(0x390) == (0x380, 0x400)
+
+    ring.pop(span)
+
+    assert [ x.__rg__() for x in ring ] == [ (0x000, 0x100), (0x400, 0x500) ]
+
+    try:
+        ring.extend([ (0x080, 0x200) ])
+
+    except MapConflict as E:
+        print 'conflict', Tools.str((0x080, 0x200))
+
+    else:
+        raise AssertionError('conflict is not detected')
+
+    dump(ring)
+
+
 if __name__ == '__main__':
     test_map_range()
     rest_map_ring_split()
     test_map_span()
     test_map_place()
+    test_map_extend()
@@ -0,0 +1,216 @@
+#!/usr/bin/env python2
+
+from sys        import path
+from os         import unlink, lseek, fstat
+from os.path    import abspath, expanduser, dirname
+from struct     import pack
+from tempfile   import mkstemp
+from unittest   import SkipTest
+
+_P_BASE     = abspath(expanduser(dirname(__file__)))
+_P_ADD      = [ '/../', '/../../' ]
+
+for x in _P_ADD: path.insert(0, _P_BASE + x)
+
+from comine.arch.elf    import Image, ElfError
+
+
+_LOADS = [
+    # vaddr,    filesz, memsz,  fill
+    (0x400000,  0x2000, 0x2000, 'a'),
+    (0x600000,  0x0000, 0x1000, None),  # not dumped to core
+    (0x7f0000,  0x1000, 0x3000, 'b'),
+]
+
+def _core(loads, kind = Image.ET_CORE, order = '<'):
+    phoff, phsize = 64, 56
+
+    data    = 64 + phsize * len(loads)
+    ehdr    = pack('<4sBBB9x', '\x7fELF', 2, '<>'.index(order) + 1, 1)
+    ehdr   += pack(order + 'HHIQQQIHHHHHH', kind, 62, 1, 0, phoff, 0, 0, 64,
+                        phsize, len(loads), 0, 0, 0)
+
+    heads, body = [], []
+
+    for vaddr, filesz, memsz, fill in loads:
+        heads.append(pack(order + 'IIQQQQQQ', Image.PT_LOAD, 6, data, vaddr,
+                            0, filesz, memsz, 0x1000))
+
+        body.append((fill or '') * filesz)
+
+        data += filesz
+
+    fd, name = mkstemp()
+
+    with open(name, 'wb') as F:
+        F.write(ehdr + ''.join(heads) + ''.join(body))
+
+    return name
+
+
+def test_elf_image():
+    name = _core(_LOADS)
+
+    try:
+        image = Image(name)
+
+        if len(image) != 2:
+            raise Exception('invalid loads %u' % len(image))
+
+        if image.read(0x401ff0, 16) != 'a' * 16:
+            raise Exception('invalid read')
+
+        if image.read(0x401ff0, 32) is not None:
+            raise Exception('read out of segment')
+
+        if image.read(0x600000, 8) is not None:
+            raise Exception('read of not dumped segment')
+
+        if image.view(0x7f0010, 4)[:] != 'bbbb':
+            raise Exception('invalid view')
+
+        if not image.covers((0x7f0000, 0x7f1000)):
+            raise Exception('load is not covered')
+
+        if image.covers((0x7f0000, 0x7f1001)):
+            raise Exception('covers memsz part of load')
+
+    finally:
+        unlink(name)
+
+def test_elf_order():
+    for order in '<>':
+        name = _core(_LOADS, order = order)
+
+        try:
+            image = Image(name)
+
+            if image.__order__() != order:
+                raise Exception('invalid byte order %s' % image.__order__())
+
+            if len(image) != 2 or image.read(0x7f0ff0, 16) != 'b' * 16:
+                raise Exception('invalid loads of %s core' % order)
+
+        finally:
+            unlink(name)
+
+def test_elf_image_find():
+    name = _core([(0x1000, 0x1000, 0x1000, 'x')])
+
+    try:
+        found = list(Image(name).find('xxxx', (0x1000, 0x1010)))
+
+        if found != [ 0x1000, 0x1004, 0x1008, 0x100c ]:
+            raise Exception('invalid search %s' % found)
+
+    finally:
+        unlink(name)
+
+def test_elf_not_core():
+    name = _core(_LOADS, kind = 2)
+
+    try:
+        Image(name)
+
+    except ElfError as E:
+        pass
+
+    else:
+        raise Exception('exec file accepted as core')
+
+    finally:
+        unlink(name)
+
+def test_elf_truncated():
+    name = _core(_LOADS)
+
+    try:
+        with open(name, 'r+b') as F:
+            F.seek(0, 2); F.truncate(F.tell() - 0x800)
+
+        image = Image(name)
+
+        if len(image) != 2:
+            raise Exception('truncated load is dropped')
+
+        if image.read(0x7f07f0, 16) != 'b' * 16:
+            raise Exception('invalid read of truncated load')
+
+        if image.read(0x7f07f8, 16) is not None:
+            raise Exception('read beyond of truncated core')
+
+        if image.read(0x401ff0, 16) != 'a' * 16:
+            raise Exception('invalid read of whole load')
+
+        with open(name, 'r+b') as F:
+            F.seek(0, 2); F.truncate(F.tell() - 0x1000)
+
+        if len(Image(name)) != 1:
+            raise Exception('load out of core is not dropped')
+
+    finally:
+        unlink(name)
+
+def test_elf_extents():
+    name, chunk = _core([(0x100000, 0x30000, 0x30000, 'z')]), 0x10000
+
+    try:
+        with open(name, 'r+b') as F:
+            F.seek(0, 2); end = F.tell(); F.truncate(end - 2 * chunk)
+            F.seek(end - chunk); F.write('z' * chunk)
+
+        image, rg = Image(name), (0x100000, 0x130000)
+
+        seq = list(image.extents(rg))
+
+        if seq[0][0][0] != rg[0] or seq[-1][0][1] != rg[1]:
+            raise Exception('extents do not cover region %s' % seq)
+
+        for (a, b), (c, d) in zip(seq, seq[1:]):
+            if a[1] != c[0]:
+                raise Exception('extents are not contigous %s' % seq)
+
+        for (a, b), data in seq:
+            if not data and image.read(a, b - a).strip('\0'):
+                raise Exception('hole 0x%x-0x%x is not zero' % (a, b))
+
+        holes = filter(lambda x: not x[1], seq)
+
+        if not _sparse(name):
+            raise SkipTest('file system has no SEEK_HOLE support')
+
+        # hole is file blocks inside of truncated part, data at 120 offset
+        lo, hi = rg[0] + chunk - 120, rg[0] + 2 * chunk - 120
+
+        if len(holes) != 1:
+            raise Exception('one hole expected, got %s' % seq)
+
+        (a, b), _ = holes[0]
+
+        if not (lo <= a < b <= hi and b - a >= chunk - 2 * 0x1000):
+            raise Exception('hole 0x%x-0x%x is out of 0x%x-0x%x'
+                                % (a, b, lo, hi))
+
+    finally:
+        unlink(name)
+
+def _sparse(name):
+    ''' True if file system of name reports holes of sparse files '''
+
+    with open(name, 'rb') as F:
+        size = fstat(F.fileno()).st_size
+
+        try:
+            return lseek(F.fileno(), 0, Image.SEEK_HOLE) < size
+
+        except OSError as E:
+            return False
+
+
+if __name__ == '__main__':
+    test_elf_image()
+    test_elf_order()
+    test_elf_image_find()
+    test_elf_not_core()
+    test_elf_truncated()
+    test_elf_extents()
@@ -0,0 +1,223 @@
+#!/usr/bin/env python2
+
+from sys        import path
+from os         import unlink
+from os.path    import abspath, expanduser, dirname
+from random     import Random
+from struct     import pack, unpack
+from tempfile   import mkstemp
+from bisect     import bisect_left
+from io         import BytesIO
+from unittest   import SkipTest
+
+_P_BASE     = abspath(expanduser(dirname(__file__)))
+_P_ADD      = [ '/../', '/../../' ]
+
+for x in _P_ADD: path.insert(0, _P_BASE + x)
+
+from comine.arch.elf    import Image
+from comine.core.freg   import Freg
+from comine.maps.span   import Span
+from comine.mine.revix  import Emit, VEmit, _pieces, _shard
+from comine.mine.blocks import Writer, Blocks
+import comine.mine.blocks as blocks
+from comine.misc.vec    import numpy
+
+
+class _Infer(object):
+    def __init__(s, base, blob):
+        s.__base    = base
+        s.__blob    = blob
+
+    def readvar(s, at, size, gdbval = True):
+        at -= s.__base
+
+        return s.__blob[at:at + size]
+
+
+def _memory(base, regs, words = 4096, seed = 7, order = '<'):
+    rnd = Random(seed)
+
+    seq = []
+
+    for z in xrange(words):
+        start, end = regs[rnd.randint(0, len(regs) - 1)]
+
+        seq.append(rnd.choice([0, rnd.randint(0, 2**64 - 1),
+                                rnd.randint(start - 8, end + 8)]))
+
+    blob = ''.join(map(lambda x: pack(order + 'Q', x), seq))
+
+    return _Infer(base, blob[3:]), (base, base + len(blob) - 3)
+
+def test_revix_vector_emit():
+    if numpy is None: return
+
+    regs = [ (0x10000, 0x18000), (0x7f0000, 0x7f8000), (0x900000, 0x900008) ]
+
+    freg, last = Freg(list(regs), None, gran = 7), None
+
+    for order in '<>':
+        infer, rg = _memory(0x7f0000, regs, order = order)
+
+        for block in [ 2**18, 1000, 15 ]:
+            ex = sorted(Emit(infer, freg.make(), order)(rg, block))
+            got = sorted(VEmit(infer, freg, order).pairs(rg, block))
+
+            if len(ex) < 100 or got != ex:
+                raise Exception('block=%u, %u != %u'
+                                    % (block, len(got), len(ex)))
+
+        words = filter(lambda x: (x[1] - rg[0] + 3) % 8 == 0, ex)
+
+        if last is not None and words != last:
+            raise Exception('byte order %s gives other pointers' % order)
+
+        last = words
+
+def _core(vaddr, blob):
+    ehdr    = pack('<4sBBB9x', '\x7fELF', 2, 1, 1)
+    ehdr   += pack('<HHIQQQIHHHHHH', Image.ET_CORE, 62, 1, 0, 64, 0, 0, 64,
+                        56, 1, 0, 0, 0)
+    phdr    = pack('<IIQQQQQQ', Image.PT_LOAD, 6, 120, vaddr, 0,
+                        len(blob), len(blob), 0x1000)
+
+    fd, name = mkstemp()
+
+    with open(name, 'wb') as F:
+        F.write(ehdr + phdr + blob)
+
+    return name
+
+def _sharded(core, regs, spans, vector):
+    found = []
+
+    for z, rgs in enumerate(_pieces(spans, 1000)):
+        path = core + '_%u_%04x_%%04x' % (vector, z)
+
+        task = (core, list(regs), None, vector, path, 50, rgs)
+
+        for name in _shard(task)[0]:
+            with open(name, 'rb') as F:
+                blob = F.read()
+
+            unlink(name)
+
+            for x in xrange(0, len(blob), 16):
+                found.append(unpack('>QQ', blob[x:x + 16]))
+
+    return found
+
+def test_revix_shard():
+    regs = [ (0x10000, 0x18000), (0x7f0000, 0x7f8000) ]
+
+    infer, rg = _memory(0x7f0000, regs)
+
+    core = _core(rg[0], infer.readvar(rg[0], rg[1] - rg[0], False))
+
+    should = sorted(Emit(infer, Freg(list(regs), None).make())(rg))
+
+    try:
+        for vector in ([ False ] if numpy is None else [ False, True ]):
+            found = _sharded(core, regs, [ Span(rg) ], vector)
+
+            if sorted(found) != should:
+                raise Exception('sharded %u != %u' % (len(found), len(should)))
+
+    finally:
+        unlink(core)
+
+def test_revix_blocks():
+    rnd, recs = Random(11), []
+
+    for z in xrange(3000):
+        addr = rnd.choice([0, 2**63, rnd.randint(0, 2**47)])
+
+        recs.append((addr, rnd.randint(0, 2**63 - 1)))
+
+    recs.sort()
+
+    F = BytesIO()
+
+    wr = Writer(F, every = 100)
+
+    for rec in recs: wr.push(*rec)
+
+    wr.close()
+
+    keys = map(lambda x: x[0], recs)
+
+    keep = blocks.numpy
+
+    try:
+        for vector in ([ False ] if keep is None else [ False, True ]):
+            blocks.numpy = keep if vector else None
+
+            store = Blocks(F.getvalue(), cache = 4)
+
+            if len(store) != len(recs) or list(store.rows(0, 3000)) != recs:
+                raise Exception('vector=%s, blocks round trip failed' % vector)
+
+            for at in xrange(0, 3000, 7):
+                addr = rnd.choice([ recs[at][0], rnd.randint(0, 2**48) ])
+
+                if store.key(at) != recs[at][0]:
+                    raise Exception('key #%u mismatch' % at)
+
+                if store.bound(addr, 0, 3000) != bisect_left(keys, addr):
+                    raise Exception('bound of 0x%x mismatch' % addr)
+
+    finally:
+        blocks.numpy = keep
+
+def test_revix_index_arrays():
+    try:
+        from comine.mine.index  import Index
+
+    except ImportError as E:    # index is usable only inside of gdb
+        raise SkipTest('no gdb runtime')
+
+    rnd = Random(5)
+
+    recs = sorted((rnd.randint(0, 2**40), rnd.randint(0, 2**63 - 1))
+                        for z in xrange(1000))
+
+    fd, raw = mkstemp()
+    fd, packed = mkstemp()
+
+    try:
+        with open(raw, 'wb') as F:
+            for rec in recs: Index.write(F, rec)
+
+        with open(packed, 'wb') as F:
+            wr = Writer(F, every = 64)
+
+            for rec in recs: wr.push(*rec)
+
+            wr.close()
+
+        for path in (raw, packed):
+            index = Index(path)
+
+            addrs, refs = index.arrays(-5, 2000)
+
+            if zip(list(addrs), list(refs)) != recs:
+                raise Exception('%s arrays mismatch' % path)
+
+            for z in xrange(50):
+                a = rnd.randint(0, 2**40); rg = (a, a + 2**32)
+
+                addrs, refs = index.lookup_arrays(rg)
+
+                if zip(list(addrs), list(refs)) != list(index.lookup(rg)):
+                    raise Exception('%s lookup arrays mismatch' % path)
+
+    finally:
+        unlink(raw); unlink(packed)
+
+
+if __name__ == '__main__':
+    test_revix_vector_emit()
+    test_revix_shard()
+    test_revix_blocks()
+    test_revix_index_arrays()
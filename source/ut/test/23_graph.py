@@ -0,0 +1,86 @@
+#!/usr/bin/env python2
+
+from sys        import path
+from os.path    import abspath, expanduser, dirname
+from unittest   import SkipTest
+
+_P_BASE     = abspath(expanduser(dirname(__file__)))
+_P_ADD      = [ '/../', '/../../' ]
+
+for x in _P_ADD: path.insert(0, _P_BASE + x)
+
+from comine.misc.vec    import numpy
+from comine.mine.graph  import _resolve, _csr
+
+
+def test_graph_resolve():
+    if numpy is None: return
+
+    start = numpy.array([ 0x100, 0x200, 0x300 ], dtype = numpy.uint64)
+    end = numpy.array([ 0x110, 0x280, 0x308 ], dtype = numpy.uint64)
+
+    addrs = [ 0x0, 0x100, 0x10f, 0x110, 0x27f, 0x300, 0x308, 0x1000 ]
+
+    got = _resolve(start, end, numpy.array(addrs, dtype = numpy.uint64))
+
+    if got.tolist() != [ -1, 0, 0, -1, 1, 2, -1, -1 ]:
+        raise Exception('invalid resolve %s' % got.tolist())
+
+def test_graph_csr():
+    if numpy is None: return
+
+    one = numpy.array([ 2, 0, 2, 0, 2 ], dtype = numpy.int64)
+    two = numpy.array([ 1, 1, 0, 1, 1 ], dtype = numpy.int64)
+
+    ptr, idx = _csr(one, two, 4)
+
+    if ptr.tolist() != [ 0, 1, 1, 3, 3 ] or idx.tolist() != [ 1, 0, 1 ]:
+        raise Exception('invalid csr %s %s' % (ptr.tolist(), idx.tolist()))
+
+class _Graph(object):
+    def __init__(s, start, links, roots):
+        one = numpy.array(map(lambda x: x[0], links), dtype = numpy.int64)
+        two = numpy.array(map(lambda x: x[1], links), dtype = numpy.int64)
+
+        s.__start   = numpy.array(start, dtype = numpy.uint64)
+        s.__fwd     = _csr(one, two, len(start))
+        s.__roots   = numpy.array(roots, dtype = numpy.uint32)
+
+    def __len__(s):         return len(s.__start)
+
+    def table(s):           return (s.__start, None, None, None)
+
+    def forward(s):         return s.__fwd
+
+    def rooted(s, terms):   return s.__roots
+
+def test_graph_mark():
+    if numpy is None: return
+
+    try:
+        from comine.mine.lost   import Mark
+
+    except ImportError as E:    # lost miner is usable only inside of gdb
+        raise SkipTest('no gdb runtime')
+
+    # 0 -> 1 -> 9, 3 -> 4 is lost cycle with 3, 10 and 11 are roots
+    links = [ (0, 1), (1, 9), (3, 4), (4, 3), (10, 2) ]
+
+    start = map(lambda x: 0x1000 + x * 0x10, xrange(12))
+
+    mark = Mark(_Graph(start, links, [ 0, 10, 11 ]), None, block = 1)
+
+    lost = filter(lambda x: mark(x) is False, start)
+
+    if lost != map(lambda x: 0x1000 + x * 0x10, [ 3, 4, 5, 6, 7, 8 ]):
+        raise Exception('invalid lost %s' % map(hex, lost))
+
+    if numpy.unpackbits(mark.__marks__()).tolist()[:12] \
+                != [ 1, 1, 1, 0, 0, 0, 0, 0, 0, 1, 1, 1 ]:
+        raise Exception('invalid marks bitmap')
+
+
+if __name__ == '__main__':
+    test_graph_resolve()
+    test_graph_csr()
+    test_graph_mark()
@@ -0,0 +1,88 @@
+#!/usr/bin/env python2
+
+from sys        import path
+from os.path    import abspath, expanduser, dirname
+
+_P_BASE     = abspath(expanduser(dirname(__file__)))
+_P_ADD      = [ '/../', '/../../' ]
+
+for x in _P_ADD: path.insert(0, _P_BASE + x)
+
+from comine.misc.vec    import numpy
+from comine.mine.graph  import _csr
+from comine.mine.retain import Retain
+
+
+class _Graph(object):
+    def __init__(s, sizes, links, roots):
+        one = numpy.array(map(lambda x: x[0], links), dtype = numpy.int64)
+        two = numpy.array(map(lambda x: x[1], links), dtype = numpy.int64)
+
+        s.__sizes   = numpy.array(sizes, dtype = numpy.uint64)
+        s.__fwd     = _csr(one, two, len(sizes))
+        s.__rev     = _csr(two, one, len(sizes))
+        s.__roots   = numpy.array(roots, dtype = numpy.int64)
+
+    def __len__(s):         return len(s.__sizes)
+
+    def table(s):           return (None, s.__sizes, None, None)
+
+    def forward(s):         return s.__fwd
+
+    def reverse(s):         return s.__rev
+
+    def rooted(s, terms):   return s.__roots
+
+
+def test_retain_diamond():
+    if numpy is None: return
+
+    # 0 -> (1, 2) -> 3 -> 4, 5 is unreachable, 6 is root pointed by 4
+    links = [ (0, 1), (0, 2), (1, 3), (2, 3), (3, 4), (5, 0), (4, 6) ]
+
+    graph = _Graph([ 16, 32, 32, 64, 128, 8, 256 ], links, [ 0, 6 ])
+
+    ret = Retain(graph, None)
+
+    root = ret.__root__()
+
+    idom = map(ret.idom, xrange(7))
+
+    if idom != [ root, 0, 0, 0, 3, -1, root ]:
+        raise Exception('invalid dominators %s' % idom)
+
+    if ret.retained(0) != (272, 5) or ret.retained(3) != (192, 2):
+        raise Exception('invalid retained sizes')
+
+    if list(ret.top(2)) != [ 0, 6 ]:
+        raise Exception('invalid top %s' % list(ret.top(2)))
+
+    if ret.breakdown(3) != { 64 : 1, 128 : 1 }:
+        raise Exception('invalid breakdown %s' % ret.breakdown(3))
+
+def test_retain_budget():
+    if numpy is None: return
+
+    graph = _Graph([ 16, 32 ], [ (0, 1) ], [ 0 ])
+
+    if Retain(graph, None, budget = Retain.cost(graph)).retained(0) != (48, 2):
+        raise Exception('invalid retained sizes')
+
+    try:
+        Retain(graph, None, budget = Retain.cost(graph) - 1)
+
+    except Exception as E:
+        pass
+
+    else:
+        raise Exception('budget is not checked')
+
+    big = _Graph([ 16 ] * 4, [ (0, 1), (1, 2), (2, 3) ], [ 0 ])
+
+    if not 0 < Retain.estimate(graph) < Retain.estimate(big):
+        raise Exception('invalid time estimation')
+
+
+if __name__ == '__main__':
+    test_retain_diamond()
+    test_retain_budget()
@@ -0,0 +1,147 @@
+#!/usr/bin/env python2
+
+from sys        import path
+from os         import unlink
+from os.path    import abspath, expanduser, dirname
+from array      import array
+from tempfile   import mkstemp, mkdtemp
+from shutil     import rmtree
+
+_P_BASE     = abspath(expanduser(dirname(__file__)))
+_P_ADD      = [ '/../', '/../../' ]
+
+for x in _P_ADD: path.insert(0, _P_BASE + x)
+
+import comine.mine.zero as zero
+
+from comine.maps.span   import Span
+from comine.misc.vec    import U64
+
+
+class _Infer(object):
+    def __init__(s, base, blob):
+        s.__base    = base
+        s.__blob    = blob
+
+    def __core__(s):    return None
+
+    def readvar(s, at, size, gdbval = True):
+        at -= s.__base
+
+        return s.__blob[at:at + size]
+
+
+def _zero_runs(vector):
+    page, base = 4096, 0x10000
+
+    blob = bytearray(page * 20)
+
+    for z in (0, 3, 4, 9, 19): blob[z * page + 100] = 1
+
+    emit = zero.Zero(_Infer(base, str(blob)), page, block = 3 * page)
+
+    keep, zero.numpy = zero.numpy, (zero.numpy if vector else None)
+
+    try:
+        span = Span(rg = (base + 5, base + len(blob)))
+
+        return map(lambda x: ((x[0] - base) / page, (x[1] - base) / page),
+                        emit(span))
+
+    finally:
+        zero.numpy = keep
+
+def test_zero_runs():
+    for vector in (False, True):
+        runs = _zero_runs(vector)
+
+        if runs != [ (1, 3), (5, 9), (10, 19) ]:
+            raise Exception('invalid zero runs %s, vector=%s' % (runs, vector))
+
+def test_zero_map():
+    pairs = array(U64, [ 0x3000, 0x5000, 0x1000, 0x2000, 0x2000, 0x2800,
+                            (1 << 32), (1 << 32) + 0x1000 ])
+
+    zmap = zero.ZMap.make(pairs)
+
+    fd, name = mkstemp()
+
+    try:
+        zmap.save(name)
+
+        zmap = zero.ZMap.load(name)
+
+    finally:
+        unlink(name)
+
+    if zmap.enum() != [ (0x1000, 0x2800), (0x3000, 0x5000),
+                            ((1 << 32), (1 << 32) + 0x1000) ]:
+        raise Exception('invalid merged zero map %s' % zmap.enum())
+
+    parts = list(zmap.subtract((0x0, 0x6000), pad = 7))
+
+    if parts != [ (0x0, 0x1007), (0x27f9, 0x3007), (0x4ff9, 0x6000) ]:
+        raise Exception('invalid subtract %s' % parts)
+
+    rg = (0x80000000, 0x80001000)
+
+    if list(zmap.subtract(rg)) != [ rg ]:
+        raise Exception('invalid subtract out of zero windows')
+
+class _Layout(object):
+    def __init__(s, base):  s.__base = base
+
+    def special(s, kind):   return s.__base
+
+
+class _World(object):
+    def __init__(s):        s.rings = {}
+
+    def by_prov(s, prov):   return s.rings.get(prov, [])
+
+    def push(s, owner, ring, provide):
+        s.rings[provide] = [ ring ]
+
+
+class _Cache(_Infer):
+    def __init__(s, base):
+        _Infer.__init__(s, 0, '')
+
+        s.__layout, s.__world = _Layout(base), _World()
+
+    def __layout__(s):  return s.__layout
+
+    def __world__(s):   return s.__world
+
+def test_zero_convert():
+    base = mkdtemp()
+
+    try:
+        with open(base + '/zero.ring', 'w') as F:
+            F.write('%016x %016x\n' % (0x3000, 0x4000))
+            F.write('%016x %016x\n' % (0x1000, 0x2000))
+
+        infer = _Cache(base)
+
+        zeroes = zero.Zeroes(infer)
+
+        zeroes.load(build = False)
+
+        if zeroes.__zmap__().enum() != [ (0x1000, 0x2000), (0x3000, 0x4000) ]:
+            raise Exception('invalid converted map %s' % zeroes.__zmap__())
+
+        if len(infer.__world__().by_prov('zero')[0]) != 2:
+            raise Exception('zero ring is not registered')
+
+        if zero.ZMap.load(base + '/zero.map').enum() \
+                    != zeroes.__zmap__().enum():
+            raise Exception('converted map is not saved')
+
+    finally:
+        rmtree(base)
+
+
+if __name__ == '__main__':
+    test_zero_runs()
+    test_zero_map()
+    test_zero_convert()
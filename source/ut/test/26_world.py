@@ -0,0 +1,167 @@
+#!/usr/bin/env python2
+
+from sys        import path
+from os.path    import abspath, expanduser, dirname
+from unittest   import SkipTest
+
+_P_BASE     = abspath(expanduser(dirname(__file__)))
+_P_ADD      = [ '/../', '/../../' ]
+
+for x in _P_ADD: path.insert(0, _P_BASE + x)
+
+from comine.iface.world import IOwner, EPhys
+from comine.maps.ring   import Ring
+from comine.mine.zero   import ZMap
+
+try:
+    from comine.core.world  import World
+
+except ImportError as E:    # world is usable only inside of gdb
+    World = None
+
+
+class _Own(IOwner):
+    pass
+
+
+class _Zero(IOwner):
+    def __init__(s, pairs):
+        s.__zmap    = ZMap.make(pairs)
+
+    def __zmap__(s):    return s.__zmap
+
+
+class _Blob(EPhys):
+    def __init__(s, rg, data):
+        s.__rg      = rg
+        s.__data    = data
+
+    def __rg__(s):  return s.__rg
+
+    def extend(s, rg, force = False):
+        return s.__rg == rg
+
+    def search(s, sub, rg = None):
+        at, end = rg or s.__rg
+
+        while True:
+            at = s.__data.find(sub, at - s.__rg[0], end - s.__rg[0])
+
+            if at < 0: break
+
+            yield s.__rg[0] + at
+
+            at = s.__rg[0] + at + len(sub)
+
+
+def _world(*rings):
+    if World is None: raise SkipTest('no gdb runtime')
+
+    world = World(None)
+
+    for ring in rings:
+        owner = type('_Own%u' % len(list(world)), (_Own, ), {})()
+
+        world.push(owner, ring)
+
+    return world
+
+
+def _rgs(result):
+    return map(lambda x: (x[0], x[2].__rg__()), result)
+
+
+def test_world_lookup():
+    one = Ring(it = [ (0x000, 0x100), (0x200, 0x300), (0x400, 0x500) ])
+    two = Ring(it = [ (0x080, 0x280), (0x480, 0x800) ])
+
+    world = _world(one, two)
+
+    assert _rgs(world.lookup(0x050)) == [ (0x50, (0x000, 0x100)) ]
+    assert _rgs(world.lookup(0x100)) == [ (0x80, (0x080, 0x280)) ]
+    assert _rgs(world.lookup(0x300)) == []
+    assert _rgs(world.lookup(0x900)) == []
+
+    assert _rgs(world.lookup(0x210)) \
+                == [ (0x010, (0x200, 0x300)), (0x190, (0x080, 0x280)) ]
+
+    big = lambda span: len(span) > 0x100
+
+    assert _rgs(world.lookup(0x210, pred = big)) == [ (0x190, (0x080, 0x280)) ]
+
+    two.make(rg = (0x900, 0xa00))
+
+    assert _rgs(world.lookup(0x900)) == [ (0x000, (0x900, 0xa00)) ]
+
+
+def test_world_lookup_many():
+    one = Ring(it = [ (0x000, 0x100), (0x200, 0x300), (0x400, 0x500) ])
+    two = Ring(it = [ (0x080, 0x280), (0x480, 0x800) ])
+
+    world = _world(one, two)
+
+    addrs = [ 0x000, 0x0ff, 0x0ff, 0x150, 0x290, 0x490, 0x600, 0x1000 ]
+
+    for at, result in world.lookup_many(addrs):
+        assert result == world.lookup(at)
+
+    big = lambda span: len(span) > 0x100
+
+    for at, result in world.lookup_many(addrs, pred = big):
+        assert result == world.lookup(at, pred = big)
+
+    try:
+        list(world.lookup_many([ 0x200, 0x100 ]))
+
+    except ValueError as E:
+        pass
+
+    else:
+        raise AssertionError('unsorted addrs are not detected')
+
+
+def test_world_lazy():
+    lazy = Ring(it = map(lambda x: (x * 0x100, x * 0x100 + 0x80), xrange(1000)))
+
+    world = _world(lazy, Ring(it = [ (0x20, 0x10000) ]))
+
+    assert _rgs(world.lookup(0x4010)) \
+                == [ (0x10, (0x4000, 0x4080)), (0x3ff0, (0x20, 0x10000)) ]
+
+    for at, result in world.lookup_many(xrange(0x8000, 0x9000, 0x40)):
+        pass
+
+    assert lazy.__lazy__() == 1000 - 1 - 0x10
+
+    assert [ x[1:] for x in lazy.bounds((0x150, 0x300)) ] \
+                == [ (0x100, 0x180), (0x200, 0x280) ]
+
+    assert lazy.__lazy__() == 1000 - 1 - 0x10
+
+
+def test_world_search():
+    data = 'a' * 0x10 + '\0' * 0x100 + 'b' * 0x10
+
+    blobs, rg = Ring(), (0x1000, 0x1120)
+
+    blobs.make(rg, exten = _Blob(rg, data))
+
+    world = _world(blobs)
+
+    world.push(_Zero([ 0x1010, 0x1110 ]), Ring(), provide = 'zero')
+
+    _at = lambda blob: map(lambda x: x[0], world.search(blob))
+
+    assert _at('a\0\0') == [ 0x100f ]
+    assert _at('\0\0b') == [ 0x110e ]
+    assert _at('a' + '\0' * 0x100 + 'b') == [ 0x100f ]
+
+    assert _at('\0' * 0x80) == [ 0x1010, 0x1090 ]
+    assert _at('\0' * 0x100) == [ 0x1010 ]
+
+
+if __name__ == '__main__':
+    test_world_lookup()
+    test_world_lookup_many()
+    test_world_lazy()
+    test_world_search()